@@ -1,13 +1,30 @@
 #!/usr/bin/python
 
-from .defs import COFF_TYPE
-from .pe import PE
-from .elf import ELF
-from .ar import AR
-from .coff import COFF
-from .obj import OBJ
+import sys
+import importlib
 
 from .defs import MAGIC, COFF_TYPE
+from .limits import Limits, LimitExceeded, BoundedFile
+from .pool import FilePool, PooledFile, DEFAULT_POOL
+
+# Format modules are imported on first use to keep start-up cheap
+LAZY_MODULES = {
+    'PE':   '.pe',
+    'ELF':  '.elf',
+    'AR':   '.ar',
+    'COFF': '.coff',
+    'OBJ':  '.obj',
+
+    'ImportTable':       '.coff',
+    'read_import_table': '.ar',
+    'read_note_info':    '.note',
+    'read_build_id':     '.note',
+}
+
+def __getattr__(name):
+    if name in LAZY_MODULES:
+        return getattr(importlib.import_module(LAZY_MODULES[name], __name__), name)
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
 
 def check_pe(file):
     file.seek(0x3c)
@@ -47,17 +64,39 @@ def check_magic(file):
     return COFF_TYPE.OBJ
 
 
-def parser(file_path):
-    file = open(file_path, 'rb+')
+def parse(file, file_path):
     coff_type = check_magic(file)
 
     if coff_type == COFF_TYPE.COFF:
+        from .coff import COFF
         return COFF(file, file_path)
     elif coff_type == COFF_TYPE.PE:
+        from .pe import PE
         return PE(file, file_path)
     elif coff_type == COFF_TYPE.ELF:
+        from .elf import ELF
         return ELF(file, file_path)
     elif coff_type == COFF_TYPE.AR:
+        from .ar import AR
         return AR(file, file_path)
     elif coff_type == COFF_TYPE.OBJ:
+        from .obj import OBJ
         return OBJ(file, file_path)
+
+def parser(file_path, limits=None, pool=None, mode='rb'):
+    # A pool keeps the descriptor count bounded for objects that stay alive
+    source = PooledFile(file_path, pool, mode) if pool is not None else open(file_path, mode)
+    file = BoundedFile(source, limits)
+
+    try:
+        obj = parse(file, file_path)
+    except BaseException:
+        file.close()
+        raise
+
+    if obj is None:
+        file.close()
+        return None
+
+    file.finish()
+    return obj
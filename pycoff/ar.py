@@ -1,10 +1,12 @@
 import datetime
 import sys
-from .coff import CoffHeader
-from .utility import Struct, get_null_string
+from .coff import CoffHeader, ImportTable, IMPORT_MAGIC, decode_import_object
+from .limits import check_count, check_size, file_size
+from .utility import Struct, FileStruct, PositionalReader, get_null_string, map_file, mapped, read_bytes, read_strings
 
 def read_archive_header(self, file):
-    self._desc.update({
+    # Copies, since callers may still hold Struct's shared default desc and filter
+    self._desc = dict(self._desc, **{
         'Date': lambda x: datetime.datetime.fromtimestamp(x) if x > 0 else 'FFFFFFFF',
         'Mode': {
             0x0040: 'IEXEC',
@@ -15,13 +17,15 @@ def read_archive_header(self, file):
             0x8000: 'IFREG',
         },
     })
-    self._filter.extend([
+    self._filter = self._filter + [
         'EndOfHeader'
-    ])
+    ]
 
     self._offset = file.tell()
     if file.read(1) != b'\n':
         file.seek(self._offset)
+    else:
+        self._offset += 1
 
     self.read('Name',        file, '*s16')
     self.read('Date',        file, 'is12')
@@ -33,36 +37,66 @@ def read_archive_header(self, file):
 
     assert(self.EndOfHeader == '`\n')
 
-def read_import_header(self, file):
-    self._desc.update({
-        'Machine': {
-            0x14c:  'x86',
-            0x8664: 'x64',
-        },
-        'TimeDateStamp': lambda x: datetime.datetime.fromtimestamp(x),
-    })
-
-    self.read('Version',       file, '*u2')
-    self.read('Machine',       file, '*u2')
-    self.read('TimeDateStamp', file, '*u4')
-    
-    '''self.read('SizeOfData',    file, '*u4')
-    self.read('Ordinal',       file, '*u2')
-
-    print(file.read(1))
-    
-    raw = int.from_bytes(file.read(2), 'little')
-    print('{0:b}'.format(raw))
-
-    self.Type = raw >> 13
-    self.NameType = (raw >> 10) & 0b111
-
-    print(file.read(20))'''
-
+def peek_member_name(file):
+    offset = file.tell()
+    if file.read(1) != b'\n':
+        file.seek(offset)
+
+    name = bytes.decode(file.read(60)[:16], errors='replace').strip()
+    # BSD stores long names in front of the member data
+    if name.startswith('#1/') and name[3:].isdigit():
+        name = bytes.decode(file.read(int(name[3:])).rstrip(b'\0'), errors='replace')
+
+    file.seek(offset)
+    return name
+
+def decode_import_table(data, offset=8):
+    imports = []
+    end = len(data)
+
+    while offset + 60 <= end:
+        if data[offset: offset + 1] == b'\n':
+            offset += 1
+            continue
+
+        name = bytes(data[offset: offset + 16]).rstrip(b' ')
+        size = int(bytes(data[offset + 48: offset + 58]).strip() or 0)
+        content = offset + 60
+
+        if name not in (b'/', b'//', b'/SYM64/') and data[content: content + 4] == IMPORT_MAGIC:
+            imp = decode_import_object(data, content)
+            if imp:
+                imports.append(imp)
+
+        offset = content + size
+
+    return ImportTable(imports)
+
+def read_import_table(file):
+    # Only the member headers and import objects of the mapping are touched
+    if not file_size(file):
+        return ImportTable()
+    data = file.mmap() if hasattr(file, 'mmap') else map_file(file)
+    try:
+        return decode_import_table(data)
+    finally:
+        if type(data) == memoryview:
+            data.release()
+        else:
+            data.close()
+
+def get_long_name(data, offset):
+    # Microsoft terminates long names with '\0', GNU with '/\n'
+    end = len(data)
+    for sep in (b'\0', b'\n'):
+        idx = data.find(sep, offset)
+        if idx >= 0:
+            end = min(end, idx)
+    return bytes.decode(data[offset: end]).rstrip('/')
 
 class ArchiveHeader(Struct):
     def __init__(self, file, desc={}, filter=[]):
-        desc.update({
+        desc = dict(desc, **{
             'Date': lambda x: datetime.datetime.fromtimestamp(x),
             'Mode': {
                 0x0040: 'IEXEC',
@@ -73,9 +107,9 @@ class ArchiveHeader(Struct):
                 0x8000: 'IFREG',
             },
         })
-        filter.extend([
+        filter = filter + [
             'EndOfHeader'
-        ])
+        ]
         super().__init__(desc=desc, filter=filter)
 
         self._offset = file.tell()
@@ -94,16 +128,22 @@ class ArchiveHeader(Struct):
 
 
 class FirstLinkerHeader(Struct):
-    def __init__(self, file):
-        super().__init__( filter=[
+    def __init__(self, file, initvars=None):
+        super().__init__(filter=[
             'Offset', 'StringTable'
-        ])
+        ], initvars=initvars)
+
+        # GNU '/SYM64/' uses 64-bit counts and offsets
+        width = getattr(self, '_Width', 4)
 
         read_archive_header(self, file)
+        check_size(file, self.Size)
+        end = file.tell() + self.Size
 
-        self.read('NumberOfSymbols', file, '+u4')
-        self.read('Offset', file, ['+u4' for i in range(self.NumberOfSymbols)])
-        self.read('StringTable', file, ['*s0' for i in range(self.NumberOfSymbols)])
+        self.read('NumberOfSymbols', file, '+u%d' % width)
+        check_count(file, 'max_symbols', self.NumberOfSymbols, width + 1)
+        self.read('Offset', file, ('+u%d' % width, self.NumberOfSymbols))
+        self.StringTable = read_strings(file, end - file.tell(), self.NumberOfSymbols)
 
         self._export_list = []
         for i in range(self.NumberOfSymbols):
@@ -118,24 +158,60 @@ class SecondLinkerHeader(Struct):
         ])
 
         read_archive_header(self, file)
+        check_size(file, self.Size)
+        end = file.tell() + self.Size
 
-        self.read('NumberOfMembers', file, '*u4')
-        self.read('Offset', file, ['*u4' for i in range(self.NumberOfMembers)])
-        self.read('NumberOfSymbols', file, '*u4')
-        self.read('Indices', file, ['*u2' for i in range(self.NumberOfSymbols)])
-        self.read('StringTable', file, ['*s0' for i in range(self.NumberOfSymbols)])
+        self.read('NumberOfMembers', file, '-u4')
+        check_count(file, 'max_members', self.NumberOfMembers, 4)
+        self.read('Offset', file, ('-u4', self.NumberOfMembers))
+        self.read('NumberOfSymbols', file, '-u4')
+        check_count(file, 'max_symbols', self.NumberOfSymbols, 3)
+        self.read('Indices', file, ('-u2', self.NumberOfSymbols))
+        self.StringTable = read_strings(file, end - file.tell(), self.NumberOfSymbols)
 
         self._indeces_map = {}
         for i in range(self.NumberOfSymbols):
             self._indeces_map.setdefault(self.Indices[i], []).append(self.StringTable[i])
 
 
+class SymdefHeader(Struct):
+    def __init__(self, file, initvars=None):
+        super().__init__(filter=[
+            'Ranlib', 'Offset', 'StringTable'
+        ], initvars=initvars)
+
+        # BSD '__.SYMDEF_64' uses 64-bit sizes and entries
+        width = getattr(self, '_Width', 4)
+        form = '-u%d' % width
+
+        read_archive_header(self, file)
+        check_size(file, self.Size)
+        end = file.tell() + self.Size
+
+        if self.Name.startswith('#1/'):
+            file.read(int(self.Name[3:]))
+
+        self.read('RanlibSize', file, form)
+        self.NumberOfSymbols = self.RanlibSize // (2 * width)
+        check_count(file, 'max_symbols', self.NumberOfSymbols, 2 * width)
+        self.read('Ranlib', file, (form, 2 * self.NumberOfSymbols))
+        self.read('StringTableSize', file, form)
+        check_size(file, self.StringTableSize)
+        strtab = file.read(self.StringTableSize)
+
+        self.Offset = self.Ranlib[1::2]
+        self.StringTable = [get_null_string(strtab, strx) for strx in self.Ranlib[0::2]]
+
+        file.seek(end)
+
+
 class LongnamesHeader(Struct):
     def __init__(self, file):
         super().__init__()
 
         read_archive_header(self, file)
 
+        check_size(file, self.Size)
         self._data = file.read(self.Size)
 
 
@@ -149,36 +225,109 @@ class ObjectFileHeader(Struct):
 
         read_archive_header(self, file)
         self._content_offset = file.tell()
+        self._content_size   = self.Size
+
+        if self.Name.startswith('#1/') and self.Name[3:].isdigit():
+            length = int(self.Name[3:])
+            self._real_name = bytes.decode(file.read(length).rstrip(b'\0'))
+            self._content_offset += length
+            self._content_size   -= length
 
         magic = file.read(4)
         if magic == b'\0\0\xFF\xFF':
             self.read('Cotent', file, CoffHeader)
 
-        file.seek(self._content_offset + self.Size)
+        file.seek(self._content_offset + self._content_size)
 
     def update_name(self, data):
-        if self.Name.startswith('/'):
-            self._real_name = get_null_string(data, int(self.Name[1:]))
+        if self.Name.startswith('#1/'):
+            return
+        if self.Name.startswith('/') and self.Name[1:].isdigit():
+            self._real_name = get_long_name(data, int(self.Name[1:]))
+        else:
+            self._real_name = self.Name.rstrip('/')
 
     def update_symbos(self, addr, indeces):
         self.Addr = addr
         self.Symbols = indeces
 
 
-class AR(Struct):
+class AR(FileStruct):
     def __init__(self, file, path):
-        super().__init__()
+        super().__init__(display=['_Format'])
 
         self._file = file
         self._path = path
-
-        self.read('FirstLinker', file, FirstLinkerHeader)
-        self.read('SecondLinker', file, SecondLinkerHeader)
-        self.read('_Longnames', file, LongnamesHeader)
-        self.read('ObjectFiles', file, [ObjectFileHeader for i in range(self.SecondLinker.NumberOfMembers)])
-
-        for i in range(len(self.ObjectFiles)):
-            self.ObjectFiles[i].update_name(self._Longnames._data)
-            # self.ObjectFiles[i].update_symbos(self.SecondLinker.Offset[i], self.SecondLinker._indeces_map[i + 1])
-
-        # print(file.read(128))
\ No newline at end of file
+        self._index = None
+        self._symbol_map = None
+        self._imports = None
+        self._longnames = b''
+
+        name = peek_member_name(file)
+        if name == '/':
+            self.read('FirstLinker', file, FirstLinkerHeader)
+            self._index = self.FirstLinker
+            if peek_member_name(file) == '/':
+                self._Format = 'Microsoft'
+                self.read('SecondLinker', file, SecondLinkerHeader)
+            else:
+                self._Format = 'GNU'
+        elif name == '/SYM64/':
+            self._Format = 'GNU'
+            self.read('FirstLinker', file, FirstLinkerHeader, {'_Width': 8})
+            self._index = self.FirstLinker
+        elif name.startswith('__.SYMDEF'):
+            self._Format = 'BSD'
+            self.read('SymbolTable', file, SymdefHeader, {'_Width': 8 if name.startswith('__.SYMDEF_64') else 4})
+            self._index = self.SymbolTable
+        else:
+            self._Format = 'BSD' if name.startswith('#1/') else 'GNU'
+
+        if peek_member_name(file) == '//':
+            self.read('_Longnames', file, LongnamesHeader)
+            self._longnames = self._Longnames._data
+
+        self.ObjectFiles = []
+        while True:
+            try:
+                member = ObjectFileHeader(file)
+            except EOFError:
+                break
+            member.update_name(self._longnames)
+            self.ObjectFiles.append(member)
+            check_count(file, 'max_members', len(self.ObjectFiles), 0)
+
+    def symbols(self):
+        if self._symbol_map is None:
+            symbol_map = {}
+            if self._index:
+                for name, offset in zip(self._index.StringTable, self._index.Offset):
+                    symbol_map.setdefault(name, offset)
+            self._symbol_map = symbol_map
+        return self._symbol_map
+
+    def imports(self):
+        if self._imports is None:
+            data = mapped(self)
+            try:
+                self._imports = decode_import_table(data)
+            finally:
+                if type(data) == memoryview:
+                    data.release()
+        return self._imports
+
+    def member(self, offset):
+        member = ObjectFileHeader(PositionalReader(self._file, offset))
+        member.update_name(self._longnames)
+        return member
+
+    def find_symbol(self, name):
+        offset = self.symbols().get(name)
+        return self.member(offset) if offset is not None else None
+
+    def read_member(self, member):
+        if type(member) == str:
+            member = self.find_symbol(member)
+            if member is None:
+                return None
+        return read_bytes(self._file, member._content_offset, member._content_size)
\ No newline at end of file
@@ -0,0 +1,224 @@
+import sys
+import argparse
+
+from . import parser, check_magic, Limits, LimitExceeded, BoundedFile
+from .defs import COFF_TYPE
+from .note import note_info, read_notes
+
+
+def open_bounded(path, limits):
+    return BoundedFile(open(path, 'rb'), limits)
+
+
+def read_headers(path, limits):
+    file = open_bounded(path, limits)
+    try:
+        coff_type = check_magic(file)
+
+        if coff_type == COFF_TYPE.PE:
+            from .pe import FileHeader, OptionHeader
+            return {
+                'FileHeader':   FileHeader(file).format(),
+                'OptionHeader': OptionHeader(file).format(),
+            }
+        elif coff_type == COFF_TYPE.ELF:
+            from .elf import FileHeader
+            return {'FileHeader': FileHeader(file).format()}
+        elif coff_type == COFF_TYPE.COFF:
+            from .coff import CoffHeader
+            return {'Coff': CoffHeader(file).format()}
+        elif coff_type == COFF_TYPE.OBJ:
+            from .obj import ObjHeader
+            return {'Header': ObjHeader(file).format()}
+        elif coff_type == COFF_TYPE.AR:
+            from .ar import AR
+            ar = AR(file, path)
+            return {'Format': ar._Format, 'NumberOfMembers': len(ar.ObjectFiles), 'NumberOfSymbols': len(ar.symbols())}
+    finally:
+        file.close()
+
+    raise ValueError('unsupported file type: {0}'.format(coff_type.name))
+
+
+def read_note_info(path, limits):
+    file = open_bounded(path, limits)
+    try:
+        return note_info(*read_notes(file))
+    finally:
+        file.close()
+
+
+def list_symbols(obj):
+    name = type(obj).__name__
+    if name == 'ELF':
+        res = []
+        for i, sh in enumerate(getattr(obj, 'SectionHeaders', [])):
+            if sh.Type in (0x02, 0x0B):
+                res.extend([dict(sd.format(), Table=sh.Name) for sd in obj.Sections[i].SectionDescriptors])
+        return res
+    elif name == 'OBJ':
+        return [obj.format_symbol(symbol) for symbol in obj.Symbols]
+    elif name == 'AR':
+        return [{'Name': k, 'Member': '{0:X}'.format(v)} for k, v in obj.symbols().items()]
+
+    raise ValueError('{0} has no symbol table'.format(name))
+
+
+def list_sections(obj):
+    name = type(obj).__name__
+    if name == 'PE':
+        return [st.format() for st in obj.SectionTable]
+    elif name == 'ELF':
+        return [sh.format() for sh in getattr(obj, 'SectionHeaders', [])]
+    elif name == 'OBJ':
+        return [st.format() for st in obj.Sections]
+    elif name == 'AR':
+        return [m.format() for m in obj.ObjectFiles]
+
+    raise ValueError('{0} has no section table'.format(name))
+
+
+def list_imports(obj):
+    if type(obj).__name__ != 'AR':
+        raise ValueError('{0} is not an import library'.format(type(obj).__name__))
+    return obj.imports().format()
+
+
+def scan(obj):
+    res = {'Type': type(obj).__name__}
+    header = getattr(obj, 'FileHeader', None) or getattr(obj, 'Header', None)
+    if header is not None and hasattr(header, 'Machine'):
+        res['Machine'] = header.format()['Machine']
+    if hasattr(obj, '_Format'):
+        res['Format'] = obj._Format
+    return res
+
+
+def with_parser(func):
+    def command(path, limits):
+        obj = parser(path, limits)
+        if obj is None:
+            raise ValueError('unsupported file type')
+        with obj:
+            return func(obj)
+    return command
+
+
+COMMANDS = {
+    'dump':     with_parser(lambda obj: obj.format()),
+    'headers':  read_headers,
+    'symbols':  with_parser(list_symbols),
+    'sections': with_parser(list_sections),
+    'imports':  with_parser(list_imports),
+    'notes':    read_note_info,
+    'scan':     with_parser(scan),
+}
+
+
+def run(job):
+    command, path, limits = job
+    try:
+        return {'path': path, 'result': COMMANDS[command](path, limits)}
+    except LimitExceeded as e:
+        return {'path': path, 'error': str(e), 'limit': e.todict()}
+    except Exception as e:
+        return {'path': path, 'error': '{0}: {1}'.format(type(e).__name__, e)}
+
+
+def iter_paths(args):
+    for path in args.paths:
+        if path == '-':
+            for line in sys.stdin:
+                line = line.rstrip('\n')
+                if line:
+                    yield line
+        else:
+            yield path
+
+
+def imap_bounded(executor, func, jobs, window):
+    # Paths are submitted from a feeder thread as slots free up, so results
+    # stream in order while stdin is still open and at most window jobs are queued
+    import queue
+    import threading
+
+    futures = queue.Queue()
+    slots = threading.Semaphore(window)
+    stop = threading.Event()
+
+    def feed():
+        try:
+            for job in jobs:
+                slots.acquire()
+                if stop.is_set():
+                    break
+                futures.put(executor.submit(func, job))
+        except BaseException as e:
+            futures.put(e)
+        futures.put(None)
+
+    threading.Thread(target=feed, daemon=True).start()
+    try:
+        while True:
+            future = futures.get()
+            if future is None:
+                return
+            if isinstance(future, BaseException):
+                if isinstance(future, RuntimeError):
+                    # The executor was shut down while the feeder was still submitting
+                    return
+                raise future
+            try:
+                yield future.result()
+            finally:
+                slots.release()
+    finally:
+        # Cancels what is still queued by hand, shutdown(cancel_futures=True) needs Python 3.9
+        stop.set()
+        slots.release()
+        while not futures.empty():
+            future = futures.get_nowait()
+            if hasattr(future, 'cancel'):
+                future.cancel()
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog='pycoff', description='Parse ELF, PE, COFF and ar files')
+    arg_parser.add_argument('command', choices=COMMANDS.keys())
+    arg_parser.add_argument('paths', nargs='*', default=['-'], help="files to parse, '-' reads paths from stdin")
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1, help='number of parallel worker processes')
+    arg_parser.add_argument('--ndjson', action='store_true', help='print one JSON object per line')
+    arg_parser.add_argument('--max-time', type=float, default=None, help='parse time budget per file in seconds')
+    arg_parser.add_argument('--max-read', type=int, default=None, help='parse read budget per file in bytes')
+    args = arg_parser.parse_intermixed_args(argv)
+
+    import json
+
+    limits = Limits(max_time=args.max_time, max_total_read=args.max_read)
+    jobs = ((args.command, path, limits) for path in iter_paths(args))
+
+    if args.jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(args.jobs)
+        results = imap_bounded(executor, run, jobs, args.jobs * 4)
+    else:
+        executor = None
+        results = map(run, jobs)
+
+    status = 0
+    try:
+        for res in results:
+            if 'error' in res:
+                status = 1
+            if args.ndjson:
+                sys.stdout.write(json.dumps(res) + '\n')
+            else:
+                sys.stdout.write(json.dumps(res, indent='\t') + '\n')
+            sys.stdout.flush()
+    except BrokenPipeError:
+        status = 1
+    finally:
+        if executor:
+            results.close()
+            executor.shutdown()
+
+    return status
@@ -1,5 +1,101 @@
 import datetime
-from .utility import Struct
+import json
+import struct
+from collections import namedtuple
+
+from .limits import check_size
+from .utility import Struct, FileStruct, read, read_strings
+
+IMPORT_MAGIC  = b'\0\0\xFF\xFF'
+IMPORT_HEADER = struct.Struct('<HHHHIIHH')
+
+IMPORT_TYPE = {
+    0: 'CODE',
+    1: 'DATA',
+    2: 'CONST',
+}
+
+IMPORT_NAME_TYPE = {
+    0: 'ORDINAL',
+    1: 'NAME',
+    2: 'NAME_NOPREFIX',
+    3: 'NAME_UNDECORATE',
+    4: 'NAME_EXPORTAS',
+}
+
+ImportObject = namedtuple('ImportObject', ['Symbol', 'Dll', 'Ordinal', 'Type', 'NameType', 'Name', 'Machine'])
+
+def get_import_name(symbol, name_type, export_name=''):
+    if name_type == 0:
+        return None
+    elif name_type == 2:
+        return symbol[1:] if symbol[:1] in ('?', '@', '_') else symbol
+    elif name_type == 3:
+        name = symbol[1:] if symbol[:1] in ('?', '@', '_') else symbol
+        return name.split('@', 1)[0]
+    elif name_type == 4:
+        return export_name
+    return symbol
+
+def decode_import_object(data, offset=0):
+    sig1, sig2, version, machine, timestamp, size, ordinal, info = IMPORT_HEADER.unpack_from(data, offset)
+    if sig1 != 0 or sig2 != 0xFFFF or version != 0:
+        return None
+
+    start = offset + IMPORT_HEADER.size
+    names = [bytes.decode(n, errors='replace') for n in bytes(data[start: start + size]).split(b'\0', 3)]
+    names.extend([''] * (3 - len(names)))
+
+    type, name_type = info & 0x3, (info >> 2) & 0x7
+    return ImportObject(names[0], names[1], ordinal, type, name_type, get_import_name(names[0], name_type, names[2]), machine)
+
+
+class ImportTable:
+    def __init__(self, imports=None):
+        self.Imports = imports or []
+        self._symbol_map = None
+        self._dll_map = None
+
+    def __len__(self):
+        return len(self.Imports)
+
+    def __iter__(self):
+        return iter(self.Imports)
+
+    def __str__(self):
+        return str(self.format())
+
+    def find(self, symbol):
+        if self._symbol_map is None:
+            self._symbol_map = {imp.Symbol: imp for imp in self.Imports}
+        return self._symbol_map.get(symbol)
+
+    def dll(self, name):
+        if self._dll_map is None:
+            dll_map = {}
+            for imp in self.Imports:
+                dll_map.setdefault(imp.Dll.lower(), []).append(imp)
+            self._dll_map = dll_map
+        return self._dll_map.get(name.lower(), [])
+
+    def exports(self):
+        res = {}
+        for imp in self.Imports:
+            res.setdefault(imp.Dll, []).append(imp.Name if imp.NameType else imp.Ordinal)
+        return res
+
+    def format(self):
+        return [{
+            'Symbol':   imp.Symbol,
+            'Dll':      imp.Dll,
+            'Ordinal':  imp.Ordinal,
+            'Type':     IMPORT_TYPE.get(imp.Type, imp.Type),
+            'NameType': IMPORT_NAME_TYPE.get(imp.NameType, imp.NameType),
+            'Name':     imp.Name,
+        } for imp in self.Imports]
+
+    def tojson(self, indent='\t'):
+        return json.dumps(self.format(), indent=indent)
 
 class ClassID(Struct):
     def __init__(self, file, desc={}, filter=[]):
@@ -16,6 +112,8 @@ class CoffHeader(Struct):
                 0x14c:  'x86',
                 0x8664: 'x64',
             },
+            'Type':     IMPORT_TYPE,
+            'NameType': IMPORT_NAME_TYPE,
             # 'TimeDateStamp': lambda x: datetime.datetime.fromtimestamp(x),
         })
         super().__init__(desc=desc, filter=filter)
@@ -27,6 +125,18 @@ class CoffHeader(Struct):
         if self.Version == 0:
             self.read('SizeOfData',    file, '*u4')
             self.read('Hint',          file, '*u2')
+
+            info = read(file, '*u2')
+            self.Type     = info & 0x3
+            self.NameType = (info >> 2) & 0x7
+
+            check_size(file, self.SizeOfData)
+            names = read_strings(file, self.SizeOfData, 3)
+            names.extend([''] * (3 - len(names)))
+            self.SymbolName = names[0]
+            self.DllName    = names[1]
+            if self.NameType != 0:
+                self.Name   = get_import_name(names[0], self.NameType, names[2])
         elif self.Version == 1:
             self.read('ClassID',       file,  ClassID)
             self.read('SizeOfData',    file, '*u4')
@@ -34,7 +144,10 @@ class CoffHeader(Struct):
             # self.read('Flag',          file, '-u1')
 
 
-class COFF(Struct):
+class COFF(FileStruct):
     def __init__(self, file, file_path, desc={}, filter=[]):
         super().__init__()
+
+        self._file = file
+        self._path = file_path
         self.read('Coff', file, CoffHeader)
\ No newline at end of file
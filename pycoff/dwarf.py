@@ -0,0 +1,544 @@
+import os
+import sys
+import json
+import tempfile
+import zlib
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+
+DW_LNS_copy               = 1
+DW_LNS_advance_pc         = 2
+DW_LNS_advance_line       = 3
+DW_LNS_set_file           = 4
+DW_LNS_const_add_pc       = 8
+DW_LNS_fixed_advance_pc   = 9
+
+DW_LNE_end_sequence       = 1
+DW_LNE_set_address        = 2
+DW_LNE_define_file        = 3
+
+DW_LNCT_path              = 1
+DW_LNCT_directory_index   = 2
+
+DW_FORM_FIXED = {
+    0x0b: 1,    # data1
+    0x05: 2,    # data2
+    0x06: 4,    # data4
+    0x07: 8,    # data8
+    0x1e: 16,   # data16
+    0x0c: 1,    # flag
+    0x25: 1,    # strx1
+    0x26: 2,    # strx2
+    0x27: 3,    # strx3
+    0x28: 4,    # strx4
+}
+
+DW_FORM_string    = 0x08
+DW_FORM_block     = 0x09
+DW_FORM_strp      = 0x0e
+DW_FORM_udata     = 0x0f
+DW_FORM_line_strp = 0x1f
+
+DW_AT_stmt_list   = 0x10
+DW_AT_comp_dir    = 0x1b
+
+# Sizes of the forms a unit DIE is skipped over with, -1 is the offset size
+# and 0xff the address size; the rest are variable and handled by skip_form
+DW_FORM_SIZE = {
+    **DW_FORM_FIXED,
+    0x01: 0xff,     # addr
+    0x0e: -1,       # strp
+    0x10: -1,       # ref_addr
+    0x11: 1,        # ref1
+    0x12: 2,        # ref2
+    0x13: 4,        # ref4
+    0x14: 8,        # ref8
+    0x17: -1,       # sec_offset
+    0x19: 0,        # flag_present
+    0x1c: 4,        # ref_sup4
+    0x1d: -1,       # strp_sup
+    0x1f: -1,       # line_strp
+    0x20: 8,        # ref_sig8
+    0x21: 0,        # implicit_const
+    0x24: 8,        # ref_sup8
+    0x29: 1,        # addrx1
+    0x2a: 2,        # addrx2
+    0x2b: 3,        # addrx3
+    0x2c: 4,        # addrx4
+    0x1f20: -1,     # GNU_ref_alt
+    0x1f21: -1,     # GNU_strp_alt
+}
+
+DW_FORM_ULEB  = (0x0f, 0x15, 0x1a, 0x1b, 0x22, 0x23, 0x1f01, 0x1f02)
+DW_FORM_BLOCK = {0x03: 2, 0x04: 4, 0x09: 0, 0x0a: 1, 0x18: 0}
+
+DW_UT_EXTRA = {
+    0x02: 8,        # type, plus the type offset
+    0x04: 8,        # skeleton
+    0x05: 8,        # split_compile
+    0x06: 8,        # split_type, plus the type offset
+}
+
+CACHE_MAGIC   = b'PYCOFFLN'
+CACHE_VERSION = 2
+
+ROW_TYPECODE = {
+    'Addresses': 'Q',
+    'Lines':     'I',
+    'Files':     'I',
+}
+
+
+def read_uleb(data, offset):
+    res = 0
+    shift = 0
+    while True:
+        b = data[offset]
+        offset += 1
+        res |= (b & 0x7f) << shift
+        if b < 0x80:
+            return res, offset
+        shift += 7
+
+def read_sleb(data, offset):
+    res = 0
+    shift = 0
+    while True:
+        b = data[offset]
+        offset += 1
+        res |= (b & 0x7f) << shift
+        shift += 7
+        if b < 0x80:
+            if b & 0x40:
+                res -= 1 << shift
+            return res, offset
+
+def read_cstring(data, offset):
+    end = data.index(b'\0', offset)
+    return bytes.decode(data[offset: end], errors='replace'), end + 1
+
+def skip_form(data, form, offset, offset_size, address_size, byteorder='little'):
+    if form in DW_FORM_SIZE:
+        size = DW_FORM_SIZE[form]
+        return offset + (offset_size if size == -1 else address_size if size == 0xff else size)
+    elif form in DW_FORM_ULEB:
+        return read_uleb(data, offset)[1]
+    elif form == 0x0d:
+        return read_sleb(data, offset)[1]
+    elif form == DW_FORM_string:
+        return data.index(b'\0', offset) + 1
+    elif form in DW_FORM_BLOCK:
+        width = DW_FORM_BLOCK[form]
+        if width:
+            size, offset = int.from_bytes(data[offset: offset + width], byteorder), offset + width
+        else:
+            size, offset = read_uleb(data, offset)
+        return offset + size
+    raise ValueError('unsupported DWARF form 0x{0:X}'.format(form))
+
+def read_abbrev(data, offset, code):
+    while True:
+        entry, offset = read_uleb(data, offset)
+        if entry == 0:
+            return None
+        tag, offset = read_uleb(data, offset)
+        offset += 1
+        attrs = []
+        while True:
+            name, offset = read_uleb(data, offset)
+            form, offset = read_uleb(data, offset)
+            if name == 0 and form == 0:
+                break
+            if form == 0x21:
+                value, offset = read_sleb(data, offset)
+            attrs.append((name, form))
+        if entry == code:
+            return attrs
+
+def read_comp_dirs(info, abbrev, debug_str=b'', line_str=b'', byteorder='little'):
+    # Maps each unit's DW_AT_stmt_list to its DW_AT_comp_dir, only the first DIE of a unit is read
+    order = '<' if byteorder == 'little' else '>'
+    comp_dirs = {}
+    abbrevs = {}
+    offset = 0
+    while offset + 4 <= len(info):
+        length, = struct.unpack_from(order + 'I', info, offset)
+        offset_size = 4
+        if length == 0xffffffff:
+            length, = struct.unpack_from(order + 'Q', info, offset + 4)
+            offset_size = 12
+        start, end = offset + offset_size, offset + offset_size + length
+        offset_size = 8 if offset_size == 12 else 4
+        offset = end
+
+        try:
+            version, = struct.unpack_from(order + 'H', info, start)
+            if version >= 5:
+                unit_type, address_size = info[start + 2], info[start + 3]
+                abbrev_offset = int.from_bytes(info[start + 4: start + 4 + offset_size], byteorder)
+                pos = start + 4 + offset_size + DW_UT_EXTRA.get(unit_type, 0)
+                if unit_type in (0x02, 0x06):
+                    pos += offset_size
+            else:
+                abbrev_offset = int.from_bytes(info[start + 2: start + 2 + offset_size], byteorder)
+                address_size = info[start + 2 + offset_size]
+                pos = start + 3 + offset_size
+
+            code, pos = read_uleb(info, pos)
+            attrs = abbrevs.get((abbrev_offset, code))
+            if attrs is None:
+                attrs = abbrevs[abbrev_offset, code] = read_abbrev(abbrev, abbrev_offset, code) or []
+
+            stmt_list = comp_dir = None
+            for name, form in attrs:
+                if name == DW_AT_stmt_list and form in (0x06, 0x07, 0x17):
+                    stmt_list = int.from_bytes(info[pos: pos + (4 if form == 0x06 else 8 if form == 0x07 else offset_size)], byteorder)
+                elif name == DW_AT_comp_dir and form == DW_FORM_string:
+                    comp_dir = read_cstring(info, pos)[0]
+                elif name == DW_AT_comp_dir and form in (DW_FORM_strp, DW_FORM_line_strp):
+                    ref = int.from_bytes(info[pos: pos + offset_size], byteorder)
+                    comp_dir = read_cstring(debug_str if form == DW_FORM_strp else line_str, ref)[0]
+                pos = skip_form(info, form, pos, offset_size if version >= 3 or form != 0x10 else address_size, address_size, byteorder)
+        except (ValueError, IndexError, struct.error):
+            continue
+
+        if stmt_list is not None and comp_dir is not None:
+            comp_dirs[stmt_list] = comp_dir
+    return comp_dirs
+
+
+class Sequence:
+    def __init__(self):
+        self.Addresses = array(ROW_TYPECODE['Addresses'])
+        self.Lines     = array(ROW_TYPECODE['Lines'])
+        self.Files     = array(ROW_TYPECODE['Files'])
+        self.Start     = 0
+        self.End       = 0
+
+
+class LineTable:
+    def __init__(self, data=b'', line_str=b'', debug_str=b'', address_size=8, byteorder='little', comp_dirs=None, comp_dir=''):
+        self._data         = data
+        self._line_str     = line_str
+        self._debug_str    = debug_str
+        self._address_size = address_size
+        self._order        = '<' if byteorder == 'little' else '>'
+        # Directory 0 of DWARF 2-4 units, by unit offset, with comp_dir for the units not listed
+        self._comp_dirs    = comp_dirs or {}
+        self._comp_dir     = comp_dir
+
+        self.Files     = []
+        self._file_map = {}
+        # (starts, sequences) sorted by start address, replaced as a whole
+        self._index     = ([], [])
+
+        # Only unit boundaries are read up front, programs are decoded on demand
+        self.Units = []
+        offset = 0
+        while offset + 4 <= len(data):
+            length, offset_size = self._unit_length(offset)
+            self.Units.append(offset)
+            offset += offset_size + length
+        self._next_unit = 0
+        self._lock = threading.Lock()
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack_from(self._order + fmt, self._data, offset)[0]
+
+    def _unit_length(self, offset):
+        length = self._unpack('I', offset)
+        if length == 0xffffffff:
+            return self._unpack('Q', offset + 4), 12
+        return length, 4
+
+    def _add_file(self, name):
+        idx = self._file_map.get(name)
+        if idx is None:
+            idx = self._file_map[name] = len(self.Files)
+            self.Files.append(name)
+        return idx
+
+    def _read_form(self, form, offset, offset_size):
+        data = self._data
+        if form == DW_FORM_string:
+            return read_cstring(data, offset)
+        elif form == DW_FORM_line_strp or form == DW_FORM_strp:
+            ref = self._unpack('I' if offset_size == 4 else 'Q', offset)
+            table = self._line_str if form == DW_FORM_line_strp else self._debug_str
+            return read_cstring(table, ref)[0], offset + offset_size
+        elif form == DW_FORM_udata:
+            return read_uleb(data, offset)
+        elif form == DW_FORM_block:
+            size, offset = read_uleb(data, offset)
+            return None, offset + size
+        elif form in DW_FORM_FIXED:
+            size = DW_FORM_FIXED[form]
+            return int.from_bytes(data[offset: offset + size], 'little' if self._order == '<' else 'big'), offset + size
+        raise ValueError('unsupported DWARF form 0x{0:X}'.format(form))
+
+    def _read_entries(self, offset, offset_size):
+        data = self._data
+        format_count = data[offset]
+        offset += 1
+        formats = []
+        for i in range(format_count):
+            content, offset = read_uleb(data, offset)
+            form, offset = read_uleb(data, offset)
+            formats.append((content, form))
+
+        count, offset = read_uleb(data, offset)
+        entries = []
+        for i in range(count):
+            entry = {}
+            for content, form in formats:
+                entry[content], offset = self._read_form(form, offset, offset_size)
+            entries.append(entry)
+        return entries, offset
+
+    def _decode_unit(self, index):
+        data = self._data
+        start = self.Units[index]
+        length, offset_size = self._unit_length(start)
+        offset = start + offset_size
+        end = offset + length
+
+        version = self._unpack('H', offset)
+        offset += 2
+        address_size = self._address_size
+        if version >= 5:
+            address_size = data[offset]
+            offset += 2
+
+        header_length = self._unpack('I' if offset_size == 4 else 'Q', offset)
+        offset += offset_size
+        program = offset + header_length
+
+        min_inst = data[offset]
+        offset += 1
+        if version >= 4:
+            offset += 1
+        line_base = struct.unpack_from('b', data, offset + 1)[0]
+        line_range = data[offset + 2]
+        opcode_base = data[offset + 3]
+        opcode_lengths = data[offset + 4: offset + 3 + opcode_base]
+        offset += 3 + opcode_base
+
+        # Map the unit's file numbers onto the shared file list, relative
+        # directories are taken from the compilation directory
+        if version >= 5:
+            dirs, offset = self._read_entries(offset, offset_size)
+            names, offset = self._read_entries(offset, offset_size)
+            dirs = [d.get(DW_LNCT_path, '') for d in dirs]
+            dirs = [os.path.join(dirs[0], d) for d in dirs]
+            files = [self._add_file(os.path.join(dirs[f.get(DW_LNCT_directory_index, 0)] if f.get(DW_LNCT_directory_index, 0) < len(dirs) else '',
+                                                 f.get(DW_LNCT_path, ''))) for f in names]
+        else:
+            comp_dir = self._comp_dirs.get(start, self._comp_dir)
+            dirs = [comp_dir]
+            while data[offset] != 0:
+                name, offset = read_cstring(data, offset)
+                dirs.append(os.path.join(comp_dir, name))
+            offset += 1
+
+            # File 0 is not valid before DWARF 5
+            files = [self._add_file(None)]
+            while data[offset] != 0:
+                name, offset = read_cstring(data, offset)
+                dir, offset = read_uleb(data, offset)
+                mtime, offset = read_uleb(data, offset)
+                size, offset = read_uleb(data, offset)
+                files.append(self._add_file(os.path.join(dirs[dir] if dir < len(dirs) else '', name)))
+
+        address_format = {2: 'H', 4: 'I', 8: 'Q'}[address_size]
+        const_add = min_inst * ((255 - opcode_base) // line_range)
+
+        sequences = []
+        address, file, line = 0, 1, 1
+        seq = Sequence()
+        offset = program
+        while offset < end:
+            opcode = data[offset]
+            offset += 1
+
+            if opcode >= opcode_base:
+                adjusted = opcode - opcode_base
+                address += min_inst * (adjusted // line_range)
+                line += line_base + adjusted % line_range
+                seq.Addresses.append(address)
+                seq.Lines.append(line)
+                seq.Files.append(files[file] if file < len(files) else self._add_file(None))
+            elif opcode == 0:
+                size, offset = read_uleb(data, offset)
+                sub = data[offset]
+                if sub == DW_LNE_end_sequence:
+                    if len(seq.Addresses):
+                        seq.Start = seq.Addresses[0]
+                        seq.End = address
+                        sequences.append(seq)
+                    seq = Sequence()
+                    address, file, line = 0, 1, 1
+                elif sub == DW_LNE_set_address:
+                    address = self._unpack(address_format, offset + 1)
+                elif sub == DW_LNE_define_file:
+                    name, pos = read_cstring(data, offset + 1)
+                    dir, pos = read_uleb(data, pos)
+                    files.append(self._add_file(os.path.join(dirs[dir] if dir < len(dirs) else '', name)))
+                offset += size
+            elif opcode == DW_LNS_copy:
+                seq.Addresses.append(address)
+                seq.Lines.append(line)
+                seq.Files.append(files[file] if file < len(files) else self._add_file(None))
+            elif opcode == DW_LNS_advance_pc:
+                value, offset = read_uleb(data, offset)
+                address += min_inst * value
+            elif opcode == DW_LNS_advance_line:
+                value, offset = read_sleb(data, offset)
+                line += value
+            elif opcode == DW_LNS_set_file:
+                file, offset = read_uleb(data, offset)
+            elif opcode == DW_LNS_const_add_pc:
+                address += const_add
+            elif opcode == DW_LNS_fixed_advance_pc:
+                address += self._unpack('H', offset)
+                offset += 2
+            else:
+                for i in range(opcode_lengths[opcode - 1]):
+                    value, offset = read_uleb(data, offset)
+
+        return sequences
+
+    def _publish(self, sequences):
+        # The index is copied and replaced as a whole so lookups never see it half updated
+        starts, merged = self._index
+        if not merged:
+            merged = sorted(sequences, key=lambda seq: seq.Start)
+            self._index = ([seq.Start for seq in merged], merged)
+            return
+
+        starts, merged = list(starts), list(merged)
+        for seq in sorted(sequences, key=lambda seq: seq.Start):
+            idx = bisect_right(starts, seq.Start)
+            starts.insert(idx, seq.Start)
+            merged.insert(idx, seq)
+        self._index = (starts, merged)
+
+    def _find(self, address):
+        starts, sequences = self._index
+        idx = bisect_right(starts, address) - 1
+        if idx < 0:
+            return None
+
+        seq = sequences[idx]
+        if address >= seq.End:
+            return None
+
+        row = bisect_right(seq.Addresses, address) - 1
+        return self.Files[seq.Files[row]], seq.Lines[row]
+
+    def _decode_next(self):
+        # Units are decoded one at a time under the lock, lookups of decoded ones need none
+        with self._lock:
+            if self._next_unit < len(self.Units):
+                self._publish(self._decode_unit(self._next_unit))
+                self._next_unit += 1
+
+    def decode_all(self):
+        with self._lock:
+            sequences = []
+            while self._next_unit < len(self.Units):
+                sequences.extend(self._decode_unit(self._next_unit))
+                self._next_unit += 1
+            if sequences:
+                self._publish(sequences)
+        return self
+
+    def lookup(self, address):
+        # Units carry no address range of their own, so a miss decodes every
+        # remaining unit once; later misses are answered from the full index
+        res = self._find(address)
+        while res is None and self._next_unit < len(self.Units):
+            self._decode_next()
+            res = self._find(address)
+        return res
+
+    def key(self):
+        dirs = json.dumps([sorted(self._comp_dirs.items()), self._comp_dir]).encode()
+        return [len(self._data), zlib.crc32(self._data), zlib.crc32(dirs)]
+
+    def save(self, path):
+        self.decode_all()
+
+        arrays = []
+        for attr, typecode in ROW_TYPECODE.items():
+            merged = array(typecode)
+            for seq in self._index[1]:
+                merged.extend(getattr(seq, attr))
+            arrays.append(merged)
+
+        header = json.dumps({
+            'key':       self.key(),
+            'byteorder': sys.byteorder,
+            'files':     self.Files,
+            'sequences': [[seq.Start, seq.End, len(seq.Addresses)] for seq in self._index[1]],
+        }).encode()
+
+        # Written next to the target and renamed so readers never see a partial cache
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.pycoff-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(CACHE_MAGIC + struct.pack('<II', CACHE_VERSION, len(header)) + header)
+                for a in arrays:
+                    a.tofile(file)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    @classmethod
+    def load(cls, path, key=None):
+        # A truncated or corrupt cache is a miss, the caller rebuilds it
+        try:
+            with open(path, 'rb') as file:
+                magic = file.read(len(CACHE_MAGIC))
+                version, size = struct.unpack('<II', file.read(8))
+                if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                    return None
+
+                header = json.loads(file.read(size))
+                if key is not None and header['key'] != key:
+                    return None
+
+                count = sum(s[2] for s in header['sequences'])
+                arrays = []
+                for typecode in ROW_TYPECODE.values():
+                    a = array(typecode)
+                    a.fromfile(file, count)
+                    if header['byteorder'] != sys.byteorder:
+                        a.byteswap()
+                    arrays.append(a)
+
+                if file.read(1) or (count and max(arrays[2]) >= len(header['files'])):
+                    return None
+        except (EOFError, ValueError, KeyError, TypeError, struct.error):
+            return None
+
+        table = cls()
+        table.Files = header['files']
+        table._file_map = {name: i for i, name in enumerate(table.Files)}
+
+        sequences = []
+        pos = 0
+        for start, end, length in header['sequences']:
+            seq = Sequence()
+            seq.Start, seq.End = start, end
+            seq.Addresses = arrays[0][pos: pos + length]
+            seq.Lines     = arrays[1][pos: pos + length]
+            seq.Files     = arrays[2][pos: pos + length]
+            sequences.append(seq)
+            pos += length
+
+        table._publish(sequences)
+
+        return table
@@ -1,4 +1,10 @@
-from .utility import Struct, get_null_string, read
+import os
+import zlib
+import struct
+from bisect import bisect_right
+
+from .limits import check_count, check_size
+from .utility import Struct, FileStruct, get_null_string, read, read_bytes, mapped, view_file
 
 SHN = {
     0X0  : 'UNDEF',
@@ -7,7 +13,7 @@ SHN = {
 }
 
 class SectionDescriptor(Struct):
-    def __init__(self, file):
+    def __init__(self, file, initvars=None):
         super().__init__(desc={
             'SectionIndex':  lambda x: '{0:X} ({1})'.format(x, SHN[x]) if x in SHN else '{0:X}'.format(x),
             'Bind': {
@@ -24,18 +30,24 @@ class SectionDescriptor(Struct):
                 3: 'SECTION',
                 4: 'FILE',
             },
-        })
-        
+        }, initvars=initvars)
+
         self.read('_NameIndex',   file, '*u4')
-        self.read('Value',        file, '*u4')
-        self.read('Size',         file, '*u4')
+        if getattr(self, '_Class', 'x86') == 'x86':
+            self.read('Value',        file, '*u4')
+            self.read('Size',         file, '*u4')
+
         # self.read('Info',         file, '*u1')
         info = read(file, '*u1')
         self.Bind = info >> 4
         self.Type = info & 0xF
         self.read('Other',        file, '*u1')
         self.read('SectionIndex', file, '*u2')
-    
+
+        if getattr(self, '_Class', 'x86') == 'x64':
+            self.read('Value',        file, '*u8')
+            self.read('Size',         file, '*u8')
+
     def update(self, data):
         self.Name = get_null_string(data, self._NameIndex)
 
@@ -44,22 +56,33 @@ class Section(Struct):
         super().__init__(initvars=initvars)
 
         self._data = file.read(self._Size)
-        self._contents = bytes.decode(self._data.strip(b'\0 ')) if self._Flags & 0x020 else ' '.join(['%02X' % b for b in self._data])
-    
+
     def format(self):
-        return self._contents
+        return bytes.decode(self._data.strip(b'\0 ')) if self._Flags & 0x020 else ' '.join(['%02X' % b for b in self._data])
 
     def update(self, StringTableIndex, sections):
         pass
 
+SYMBOL_SIZE = {
+    'x86': 16,
+    'x64': 24,
+}
+
 class SymbolSection(Struct):
     def __init__(self, file, initvars):
         super().__init__(initvars=initvars)
 
-        self._Count = self._Size // self._EntSize
-        self.read('SectionDescriptors', file, [SectionDescriptor for i in range(self._Count)])
+        # Descriptors are read at their real size, sh_entsize is untrusted
+        entry_size = SYMBOL_SIZE[self._Class]
+        self._Count = self._Size // entry_size if self._EntSize else 0
+        check_count(file, 'max_symbols', self._Count, entry_size)
+        self.read('SectionDescriptors', file, [SectionDescriptor for i in range(self._Count)], {
+            '_Class': self._Class
+        })
 
     def update(self, StringTableIndex, sections):
+        if StringTableIndex >= len(sections):
+            return
         for sd in self.SectionDescriptors:
             sd.update(sections[StringTableIndex]._data)
 
@@ -76,9 +99,14 @@ class StringSection(Struct):
     def update(self, StringTableIndex, sections):
         pass
 
+SHF_COMPRESSED = 0x800
+
+PT_LOAD = 0x01
+
 SECTION_ENTRY = {
     0x02: SymbolSection,
     0x03: StringSection,
+    0x0B: SymbolSection,
 }
 
 class FileHeader(Struct):
@@ -171,7 +199,6 @@ class ProgramHeader(Struct):
             self.read('PAddr',   file, '*u4')
             self.read('Filesz',  file, '*u4')
             self.read('Memsz',   file, '*u4')
-            self.read('Filesz',  file, '*u4')
             self.read('Flags',   file, '*u4')
             self.read('Align',   file, '*u4')
         else:
@@ -248,7 +275,7 @@ class SectionHeader(Struct):
     def update(self, shstrndx, sections):
         self.Name = get_null_string(sections[shstrndx]._data, self._NameIndex)
 
-class ELF(Struct):
+class ELF(FileStruct):
     def __init__(self, file, path):
         super().__init__(
             filter=['ProgramHeaders', 'SectionHeaders']
@@ -258,27 +285,38 @@ class ELF(Struct):
 
         self._file = file
         self._path = path
+        self._mmap = None
+        self._segment_map = None
 
         self.read('FileHeader', file, FileHeader)
+        self._pointer = struct.Struct(('<' if self.FileHeader.EI_Data == 1 else '>') + ('I' if self.FileHeader._Class == 'x86' else 'Q'))
 
         if self.FileHeader.ProgramHeaderNum > 0:
+            file.seek(self.FileHeader.ProgramHeaderOffset)
+            check_count(file, 'max_sections', self.FileHeader.ProgramHeaderNum, self.FileHeader.ProgramHeaderSize)
             self.read('ProgramHeaders', file, [ProgramHeader for i in range(self.FileHeader.ProgramHeaderNum)], {
                 '_Class': self.FileHeader._Class
             })
 
         if self.FileHeader.SectionHeaderNum > 0:
             file.seek(self.FileHeader.SectionHeaderOffset)
+            check_count(file, 'max_sections', self.FileHeader.SectionHeaderNum, self.FileHeader.SectionHeaderSize)
             self.read('SectionHeaders', file, [SectionHeader for i in range(self.FileHeader.SectionHeaderNum)], {
                 '_Class': self.FileHeader._Class
             })
 
             self.Sections = []
             for sh in self.SectionHeaders:
+                # NOBITS sections occupy no space in the file
+                size = 0 if sh.Type == 0x08 else sh.Size
+                check_size(file, size, sh.Offset)
+
                 file.seek(sh.Offset)
                 self.Sections.append(read(file, Section if sh.Type not in SECTION_ENTRY else SECTION_ENTRY[sh.Type], {
-                    '_Size'   : sh.Size,
+                    '_Size'   : size,
                     '_Flags'  : sh.Flags,
                     '_EntSize': sh.EntSize,
+                    '_Class'  : self.FileHeader._Class,
                 }))
 
             # Update SectionHeaders
@@ -287,7 +325,135 @@ class ELF(Struct):
                 if sh.Name == '.strtab':
                     self.FileHeader._StringTableIndex = i
 
-            # Update Sections
+            # Update Sections, symbol tables name their string table in Link
             for i, section in enumerate(self.Sections):
-                section.update(self.FileHeader._StringTableIndex, self.Sections)
+                section.update(self.SectionHeaders[i].Link, self.Sections)
                 setattr(self, self.SectionHeaders[i].Name, section)
+
+    def section(self, name):
+        for sh, section in zip(getattr(self, 'SectionHeaders', []), getattr(self, 'Sections', [])):
+            if sh.Name == name:
+                return sh, section
+        return None, None
+
+    def section_data(self, name):
+        sh, section = self.section(name)
+        if section is None or not hasattr(section, '_data'):
+            return None
+
+        data = section._data
+        if sh.Flags & SHF_COMPRESSED:
+            order = 'little' if self.FileHeader.EI_Data == 1 else 'big'
+            header_size = 12 if self.FileHeader._Class == 'x86' else 24
+            if int.from_bytes(data[:4], order) != 1:
+                raise ValueError('unsupported compression in {0}'.format(name))
+            data = zlib.decompress(data[header_size:])
+        return data
+
+    def line_table(self, cache=None, comp_dir=''):
+        from .dwarf import LineTable, read_comp_dirs
+
+        data = self.section_data('.debug_line')
+        if data is None:
+            return None
+
+        # comp_dir stands in for units whose DW_AT_comp_dir is not in .debug_info
+        byteorder = 'little' if self.FileHeader.EI_Data == 1 else 'big'
+        line_str = self.section_data('.debug_line_str') or b''
+        debug_str = self.section_data('.debug_str') or b''
+        info, abbrev = self.section_data('.debug_info'), self.section_data('.debug_abbrev')
+        comp_dirs = read_comp_dirs(info, abbrev, debug_str, line_str, byteorder) if info and abbrev else {}
+
+        table = LineTable(data,
+            line_str=line_str,
+            debug_str=debug_str,
+            address_size=4 if self.FileHeader._Class == 'x86' else 8,
+            byteorder=byteorder,
+            comp_dirs=comp_dirs,
+            comp_dir=comp_dir)
+
+        if cache:
+            cached = LineTable.load(cache, table.key()) if os.path.exists(cache) else None
+            if cached is not None:
+                return cached
+            table.save(cache)
+
+        return table
+
+    def notes(self):
+        from .note import PT_NOTE, SHT_NOTE, decode_notes
+
+        order = '<' if self.FileHeader.EI_Data == 1 else '>'
+        notes = []
+        for ph in getattr(self, 'ProgramHeaders', []):
+            if ph.Type == PT_NOTE and ph.Filesz:
+                notes.extend(decode_notes(read_bytes(self._file, ph.Offset, ph.Filesz), order, ph.Align))
+        if notes or getattr(self, 'ProgramHeaders', None):
+            return notes
+
+        # Relocatable files have no segments, only note sections
+        for sh, section in zip(getattr(self, 'SectionHeaders', []), getattr(self, 'Sections', [])):
+            if sh.Type == SHT_NOTE:
+                notes.extend(decode_notes(section._data, order, sh.AddrAlign))
+        return notes
+
+    def note_info(self):
+        from .note import note_info
+
+        return note_info(self.notes(), '<' if self.FileHeader.EI_Data == 1 else '>', 4 if self.FileHeader._Class == 'x86' else 8)
+
+    def build_id(self):
+        return self.note_info()['BuildID']
+
+    def _segments(self):
+        # PT_LOAD segments sorted by address and by file offset for bisection
+        if self._segment_map is None:
+            loads = [(ph.VAddr, ph.VAddr + ph.Memsz, ph.Offset, ph.Filesz)
+                     for ph in getattr(self, 'ProgramHeaders', []) if ph.Type == PT_LOAD and ph.Memsz]
+            by_addr = sorted(loads)
+            by_offset = sorted(loads, key=lambda seg: seg[2])
+            self._segment_map = ([seg[0] for seg in by_addr], by_addr, [seg[2] for seg in by_offset], by_offset)
+        return self._segment_map
+
+    def segment(self, va):
+        starts, segments = self._segments()[:2]
+        idx = bisect_right(starts, va) - 1
+        if idx >= 0 and va < segments[idx][1]:
+            return segments[idx]
+        return None
+
+    def va_to_offset(self, va):
+        seg = self.segment(va)
+        if seg is None or va - seg[0] >= seg[3]:
+            return None
+        return seg[2] + va - seg[0]
+
+    def offset_to_va(self, offset):
+        starts, segments = self._segments()[2:]
+        idx = bisect_right(starts, offset) - 1
+        if idx >= 0 and offset < segments[idx][2] + segments[idx][3]:
+            return segments[idx][0] + offset - segments[idx][2]
+        return None
+
+    def view(self, offset, size):
+        return view_file(self, offset, size)
+
+    def read_va(self, va, size):
+        seg = self.segment(va)
+        if seg is None or va + size > seg[1]:
+            raise ValueError('0x{0:X} bytes at VA 0x{1:X} are not inside one loaded segment'.format(size, va))
+
+        delta = va - seg[0]
+        if delta + size <= seg[3]:
+            return self.view(seg[2] + delta, size)
+
+        # Memsz beyond Filesz is zero-filled when loaded
+        filled = max(seg[3] - delta, 0)
+        return memoryview(bytes(self.view(seg[2] + delta, filled)) + bytes(size - filled))
+
+    def read_pointer(self, va):
+        pointer = self._pointer
+        seg = self.segment(va)
+        if seg is None or va - seg[0] + pointer.size > seg[3]:
+            return pointer.unpack(self.read_va(va, pointer.size))[0]
+        return pointer.unpack_from(mapped(self), seg[2] + va - seg[0])[0]
@@ -0,0 +1,109 @@
+import os
+import time
+
+from .utility import pread
+
+
+class LimitExceeded(Exception):
+    def __init__(self, limit, value, maximum, offset=None):
+        self.limit   = limit
+        self.value   = value
+        self.maximum = maximum
+        self.offset  = offset
+
+        message = '{0} = {1} exceeds {2}'.format(limit, value, maximum)
+        if offset is not None:
+            message += ' at offset 0x{0:X}'.format(offset)
+        super().__init__(message)
+
+    def todict(self):
+        return {
+            'limit':   self.limit,
+            'value':   self.value,
+            'maximum': self.maximum,
+            'offset':  self.offset,
+        }
+
+
+class Limits:
+    def __init__(self, max_sections=65535, max_symbols=10000000, max_members=1000000,
+                 max_section_size=None, max_total_read=None, max_time=None):
+        self.max_sections     = max_sections
+        self.max_symbols      = max_symbols
+        self.max_members      = max_members
+        self.max_section_size = max_section_size
+        self.max_total_read   = max_total_read
+        self.max_time         = max_time
+
+
+DEFAULT_LIMITS = Limits()
+
+
+class BoundedFile:
+    # Enforces a Limits budget on every read while a file is being parsed.
+    def __init__(self, file, limits=None):
+        self._file      = file
+        self.limits     = limits or DEFAULT_LIMITS
+        self.size       = file_size(file)
+        self.bytes_read = 0
+        self._deadline  = time.monotonic() + self.limits.max_time if self.limits.max_time is not None else None
+        self._active    = True
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def _check_time(self, offset):
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise LimitExceeded('max_time', time.monotonic() - self._deadline + self.limits.max_time,
+                                self.limits.max_time, offset)
+
+    def _charge(self, size, offset):
+        self.bytes_read += size
+        if self.limits.max_total_read is not None and self.bytes_read > self.limits.max_total_read:
+            raise LimitExceeded('max_total_read', self.bytes_read, self.limits.max_total_read, offset)
+
+    def read(self, size=-1):
+        if not self._active:
+            return self._file.read(size)
+
+        self._check_time(self._file.tell())
+        data = self._file.read(size)
+        self._charge(len(data), self._file.tell())
+        return data
+
+    def pread(self, offset, size):
+        if self._active:
+            self._check_time(offset)
+        data = pread(self._file, offset, size)
+        if self._active:
+            self._charge(len(data), offset)
+        return data
+
+    def finish(self):
+        # Budgets only cover the parse itself, not later lazy reads.
+        self._active = False
+
+
+def file_size(file):
+    size = getattr(file, 'size', None)
+    return size if size is not None else os.fstat(file.fileno()).st_size
+
+
+def file_limits(file):
+    return getattr(file, 'limits', None) or DEFAULT_LIMITS
+
+
+def check_count(file, limit, count, entry_size, offset=None):
+    offset = file.tell() if offset is None else offset
+    maximum = getattr(file_limits(file), limit) if limit else None
+
+    if maximum is not None and count > maximum:
+        raise LimitExceeded(limit, count, maximum, offset)
+
+    remaining = max(file_size(file) - offset, 0)
+    if count * entry_size > remaining:
+        raise LimitExceeded('file_size', count * entry_size, remaining, offset)
+
+
+def check_size(file, size, offset=None):
+    check_count(file, 'max_section_size', size, 1, offset)
@@ -0,0 +1,195 @@
+import struct
+from collections import namedtuple
+
+from .defs import MAGIC
+from .limits import check_count, check_size
+from .utility import read_bytes
+
+Note = namedtuple('Note', ['Name', 'Type', 'Desc'])
+
+PT_NOTE  = 0x04
+SHT_NOTE = 0x07
+
+NT_GNU_ABI_TAG         = 1
+NT_GNU_BUILD_ID        = 3
+NT_GNU_GOLD_VERSION    = 4
+NT_GNU_PROPERTY_TYPE_0 = 5
+
+# e_type .. e_shstrndx and p_type .. p_align, without the byte order
+ELF_HEADER = {
+    'x86': 'HHIIIIIHHHHHH',
+    'x64': 'HHIQQQIHHHHHH',
+}
+
+PROGRAM_HEADER = {
+    'x86': 'IIIIIIII',
+    'x64': 'IIQQQQQQ',
+}
+
+SECTION_HEADER = {
+    'x86': 'IIIIIIIIII',
+    'x64': 'IIQQQQIIQQ',
+}
+
+NOTE_HEADER = 'III'
+
+ABI_TAG_OS = {
+    0: 'Linux',
+    1: 'Hurd',
+    2: 'Solaris',
+    3: 'FreeBSD',
+}
+
+GNU_PROPERTY = {
+    0x00000001: 'STACK_SIZE',
+    0x00000002: 'NO_COPY_ON_PROTECTED',
+    0xC0000000: 'AARCH64_FEATURE_1_AND',
+    0xC0000002: 'X86_FEATURE_1_AND',
+    0xC0008002: 'X86_ISA_1_NEEDED',
+    0xC0010001: 'X86_FEATURE_2_USED',
+    0xC0010002: 'X86_ISA_1_USED',
+}
+
+GNU_PROPERTY_FLAGS = {
+    'AARCH64_FEATURE_1_AND': {
+        0x1: 'BTI',
+        0x2: 'PAC',
+    },
+    'X86_FEATURE_1_AND': {
+        0x1: 'IBT',
+        0x2: 'SHSTK',
+    },
+    'X86_ISA_1_NEEDED': {
+        0x1: 'x86-64-baseline',
+        0x2: 'x86-64-v2',
+        0x4: 'x86-64-v3',
+        0x8: 'x86-64-v4',
+    },
+    'X86_ISA_1_USED': {
+        0x1: 'x86-64-baseline',
+        0x2: 'x86-64-v2',
+        0x4: 'x86-64-v3',
+        0x8: 'x86-64-v4',
+    },
+}
+
+
+def align_up(value, align):
+    return (value + align - 1) & ~(align - 1)
+
+def decode_notes(data, order='<', align=4):
+    # Name and descriptor start 4-byte aligned, or 8-byte aligned in 8-aligned note segments
+    align = 8 if align == 8 else 4
+    header = struct.Struct(order + NOTE_HEADER)
+
+    notes = []
+    offset = 0
+    while offset + header.size <= len(data):
+        namesz, descsz, kind = header.unpack_from(data, offset)
+        name = offset + header.size
+        desc = align_up(name + namesz, align)
+        if desc + descsz > len(data):
+            break
+
+        notes.append(Note(bytes.decode(bytes(data[name: name + namesz]).rstrip(b'\0'), errors='replace'), kind, bytes(data[desc: desc + descsz])))
+        offset = align_up(desc + descsz, align)
+
+    return notes
+
+def decode_abi_tag(desc, order='<'):
+    if len(desc) < 16:
+        return None
+    os, major, minor, sub = struct.unpack_from(order + 'IIII', desc)
+    return '{0} {1}.{2}.{3}'.format(ABI_TAG_OS.get(os, os), major, minor, sub)
+
+def decode_properties(desc, order='<', width=8):
+    properties = []
+    offset = 0
+    while offset + 8 <= len(desc):
+        kind, size = struct.unpack_from(order + 'II', desc, offset)
+        data = desc[offset + 8: offset + 8 + size]
+        offset = align_up(offset + 8 + size, width)
+
+        name = GNU_PROPERTY.get(kind, kind)
+        value = int.from_bytes(data, 'little' if order == '<' else 'big') if size in (4, 8) else data.hex()
+        if name in GNU_PROPERTY_FLAGS and type(value) == int:
+            flags = GNU_PROPERTY_FLAGS[name]
+            value = [flags.get(1 << i, '0x{0:X}'.format(1 << i)) for i in range(size * 8) if value >> i & 1]
+        properties.append({'Type': name, 'Value': value})
+    return properties
+
+def note_info(notes, order='<', width=8):
+    res = {
+        'BuildID':    None,
+        'ABITag':     None,
+        'Properties': [],
+        'Notes':      [],
+    }
+
+    for note in notes:
+        if note.Name == 'GNU' and note.Type == NT_GNU_BUILD_ID:
+            res['BuildID'] = note.Desc.hex()
+        elif note.Name == 'GNU' and note.Type == NT_GNU_ABI_TAG:
+            res['ABITag'] = decode_abi_tag(note.Desc, order)
+        elif note.Name == 'GNU' and note.Type == NT_GNU_PROPERTY_TYPE_0:
+            res['Properties'].extend(decode_properties(note.Desc, order, width))
+        res['Notes'].append({'Name': note.Name, 'Type': note.Type, 'Size': len(note.Desc)})
+
+    return res
+
+
+def read_notes(file):
+    # Fast path: only the ELF header, the program headers and PT_NOTE segments
+    # are read, or the section headers and SHT_NOTE sections of relocatable files
+    ident = read_bytes(file, 0, 16)
+    if ident[:4] != MAGIC.ELF:
+        raise ValueError('not an ELF file')
+
+    elf_class = 'x86' if ident[4] == 1 else 'x64'
+    order = '<' if ident[5] == 1 else '>'
+    header = struct.Struct(order + ELF_HEADER[elf_class])
+    check_size(file, header.size, 16)
+    fields = header.unpack(read_bytes(file, 16, header.size))
+    phoff, shoff, phentsize, phnum, shentsize, shnum = fields[4], fields[5], fields[8], fields[9], fields[10], fields[11]
+    width = 4 if elf_class == 'x86' else 8
+
+    phdr = struct.Struct(order + PROGRAM_HEADER[elf_class])
+    if phentsize < phdr.size:
+        phnum = 0
+    check_count(file, 'max_sections', phnum, phentsize, phoff)
+    table = read_bytes(file, phoff, phnum * phentsize)
+
+    notes = []
+    for i in range(phnum):
+        ph = phdr.unpack_from(table, i * phentsize)
+        offset, size, align = (ph[1], ph[4], ph[7]) if elf_class == 'x86' else (ph[2], ph[5], ph[7])
+        if ph[0] == PT_NOTE and size:
+            check_size(file, size, offset)
+            notes.extend(decode_notes(read_bytes(file, offset, size), order, align))
+    if phnum:
+        return notes, order, width
+
+    shdr = struct.Struct(order + SECTION_HEADER[elf_class])
+    if shentsize < shdr.size or not shoff:
+        return notes, order, width
+    if shnum == 0:
+        # Section counts past 0xFF00 are kept in the size of section 0
+        check_size(file, shdr.size, shoff)
+        shnum = shdr.unpack(read_bytes(file, shoff, shdr.size))[5]
+    check_count(file, 'max_sections', shnum, shentsize, shoff)
+    table = read_bytes(file, shoff, shnum * shentsize)
+
+    for i in range(shnum):
+        sh = shdr.unpack_from(table, i * shentsize)
+        if sh[1] == SHT_NOTE and sh[5]:
+            check_size(file, sh[5], sh[4])
+            notes.extend(decode_notes(read_bytes(file, sh[4], sh[5]), order, sh[8]))
+
+    return notes, order, width
+
+def read_note_info(file_path):
+    with open(file_path, 'rb') as file:
+        return note_info(*read_notes(file))
+
+def read_build_id(file_path):
+    return read_note_info(file_path)['BuildID']
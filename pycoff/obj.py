@@ -1,22 +1,174 @@
-import datetime
-from .utility import Struct
-
-class ObjHeader(Struct):
-    def __init__(self, file, desc={}, filter=[]):
-        desc.update({
-            'Machine': {
-                0x14c:  'x86',
-                0x8664: 'x64',
-            },
-            'TimeDateStamp': lambda x: datetime.datetime.fromtimestamp(x),
-        })
-        super().__init__(desc=desc, filter=filter)
-
-        self.read('Machine',       file, '*u2')
-        self.read('NumberOfSections',     file, '*u2')
-        self.read('TimeDateStamp',        file, '*u4')
-
-class OBJ(Struct):
-    def __init__(self, file, file_path, desc={}, filter=[]):
-        super().__init__()
-        self.read('Header', file, ObjHeader)
\ No newline at end of file
+import datetime
+import struct
+from collections import namedtuple
+
+from .limits import check_count, check_size
+from .pe import SectionTable
+from .utility import Struct, FileStruct, get_null_string, read_bytes
+
+Symbol = namedtuple('Symbol', ['Index', 'Name', 'Value', 'SectionNumber', 'Type', 'StorageClass', 'Aux'])
+Relocation = namedtuple('Relocation', ['VirtualAddress', 'SymbolTableIndex', 'Type'])
+
+SYMBOL_FORMAT     = struct.Struct('<8sIhHBB')
+RELOCATION_FORMAT = struct.Struct('<IIH')
+SECTION_AUX       = struct.Struct('<IHHIHB')
+FUNCTION_AUX      = struct.Struct('<IIII')
+WEAK_AUX          = struct.Struct('<II')
+
+IMAGE_SCN_LNK_NRELOC_OVFL = 0x01000000
+
+STORAGE_CLASS = {
+    0:   'NULL',
+    2:   'EXTERNAL',
+    3:   'STATIC',
+    6:   'LABEL',
+    101: 'FUNCTION',
+    103: 'FILE',
+    104: 'SECTION',
+    105: 'WEAK_EXTERNAL',
+}
+
+SECTION_NUMBER = {
+    0:  'UNDEFINED',
+    -1: 'ABSOLUTE',
+    -2: 'DEBUG',
+}
+
+
+def get_symbol_name(name, strtab):
+    if name[:4] == b'\0\0\0\0':
+        return get_null_string(strtab, int.from_bytes(name[4:], 'little'))
+    return bytes.decode(name.rstrip(b'\0'), errors='replace')
+
+def decode_symbols(data, strtab):
+    symbols = []
+    count = len(data) // SYMBOL_FORMAT.size
+    size = SYMBOL_FORMAT.size
+
+    i = 0
+    while i < count:
+        name, value, section, type, storage, naux = SYMBOL_FORMAT.unpack_from(data, i * size)
+        aux = tuple(data[(i + k) * size: (i + k + 1) * size] for k in range(1, min(naux, count - i - 1) + 1))
+        symbols.append(Symbol(i, get_symbol_name(name, strtab), value, section, type, storage, aux))
+        i += naux + 1
+
+    return symbols
+
+def decode_aux(symbol):
+    if not symbol.Aux:
+        return None
+
+    if symbol.StorageClass == 103:
+        return {'FileName': bytes.decode(b''.join(symbol.Aux).rstrip(b'\0'), errors='replace')}
+    elif symbol.StorageClass == 3 and symbol.Type == 0:
+        length, nreloc, nlnno, checksum, number, selection = SECTION_AUX.unpack_from(symbol.Aux[0])
+        return {
+            'Length':              length,
+            'NumberOfRelocations': nreloc,
+            'NumberOfLinenumbers': nlnno,
+            'CheckSum':            checksum,
+            'Number':              number,
+            'Selection':           selection,
+        }
+    elif symbol.StorageClass == 105:
+        tag, characteristics = WEAK_AUX.unpack_from(symbol.Aux[0])
+        return {'TagIndex': tag, 'Characteristics': characteristics}
+    elif symbol.StorageClass == 2 and symbol.Type >> 4 == 2:
+        tag, total, linenumber, next = FUNCTION_AUX.unpack_from(symbol.Aux[0])
+        return {
+            'TagIndex':              tag,
+            'TotalSize':             total,
+            'PointerToLinenumber':   linenumber,
+            'PointerToNextFunction': next,
+        }
+    return None
+
+def decode_relocations(data):
+    return [Relocation(*r) for r in RELOCATION_FORMAT.iter_unpack(data)]
+
+
+class ObjHeader(Struct):
+    def __init__(self, file, desc={}, filter=[]):
+        desc.update({
+            'Machine': {
+                0x14c:  'x86',
+                0x8664: 'x64',
+            },
+            'TimeDateStamp': lambda x: datetime.datetime.fromtimestamp(x),
+        })
+        super().__init__(desc=desc, filter=filter)
+
+        self.read('Machine',              file, '*u2')
+        self.read('NumberOfSections',     file, '*u2')
+        self.read('TimeDateStamp',        file, '*u4')
+        self.read('PointerToSymbolTable', file, '*u4')
+        self.read('NumberOfSymbols',      file, '*u4')
+        self.read('SizeOfOptionalHeader', file, '*u2')
+        self.read('Characteristics',      file, '*u2')
+
+class OBJ(FileStruct):
+    def __init__(self, file, file_path, desc={}, filter=[]):
+        super().__init__(filter=['Symbols', 'Relocations'])
+
+        self._file = file
+        self._path = file_path
+
+        self.read('Header', file, ObjHeader)
+        file.seek(file.tell() + self.Header.SizeOfOptionalHeader)
+
+        check_count(file, 'max_sections', self.Header.NumberOfSections, 40)
+        self.read('Sections', file, [SectionTable for i in range(self.Header.NumberOfSections)])
+
+        # Symbol table, immediately followed by the string table
+        self._strtab = b''
+        self.Symbols = []
+        if self.Header.PointerToSymbolTable:
+            table_size = self.Header.NumberOfSymbols * SYMBOL_FORMAT.size
+            check_count(file, 'max_symbols', self.Header.NumberOfSymbols, SYMBOL_FORMAT.size, self.Header.PointerToSymbolTable)
+
+            file.seek(self.Header.PointerToSymbolTable)
+            data = file.read(table_size)
+
+            strtab_size = int.from_bytes(file.read(4), 'little')
+            if strtab_size > 4:
+                check_size(file, strtab_size - 4)
+                self._strtab = b'\0\0\0\0' + file.read(strtab_size - 4)
+
+            self.Symbols = decode_symbols(data, self._strtab)
+
+        self._symbol_map = {symbol.Index: symbol for symbol in self.Symbols}
+
+        # Sections with names longer than 8 bytes refer to the string table
+        self.Relocations = []
+        for section in self.Sections:
+            if section.Name.startswith('/') and section.Name[1:].isdigit():
+                section.Name = get_null_string(self._strtab, int(section.Name[1:]))
+            self.Relocations.append(self.read_relocations(section))
+
+    def read_relocations(self, section):
+        offset = section.PointerToRelocations
+        count = section.NumberOfRelocations
+        if offset == 0 or count == 0:
+            return []
+
+        if section.Characteristics & IMAGE_SCN_LNK_NRELOC_OVFL and count == 0xFFFF:
+            # The real count is stored in the first relocation, which is not a real entry
+            count = int.from_bytes(read_bytes(self._file, offset, 4), 'little') - 1
+            offset += RELOCATION_FORMAT.size
+
+        check_count(self._file, None, count, RELOCATION_FORMAT.size, offset)
+        return decode_relocations(read_bytes(self._file, offset, count * RELOCATION_FORMAT.size))
+
+    def symbol(self, index):
+        return self._symbol_map.get(index)
+
+    def format_symbol(self, symbol):
+        return {
+            'Index':         symbol.Index,
+            'Name':          symbol.Name,
+            'Value':         '{0:X}'.format(symbol.Value),
+            'SectionNumber': SECTION_NUMBER.get(symbol.SectionNumber, symbol.SectionNumber),
+            'Type':          '{0:X}'.format(symbol.Type),
+            'StorageClass':  STORAGE_CLASS.get(symbol.StorageClass, symbol.StorageClass),
+            'Aux':           decode_aux(symbol),
+        }
@@ -1,7 +1,22 @@
 import sys
+import mmap
+import struct
+import hashlib
 import datetime
 
-from .utility import Struct, Version
+from .limits import check_count
+from .utility import Struct, FileStruct, Version, mapped, view_file
+
+CHUNK_SIZE = 1 << 20
+
+def fold_checksum(data, offset):
+    # 65536 = 1 (mod 0xFFFF), so a little-endian integer of the data is
+    # congruent to the sum of its 16-bit words: the end-around carry sum.
+    value = int.from_bytes(data, 'little')
+    if offset & 1:
+        value <<= 8
+    return value % 0xFFFF
+
 
 class Version2(Version):
     def __init__(self, file):
@@ -29,9 +44,9 @@ class SectionTable(Struct):
         self.read('VirtualSize',          file, '*u4')
         self.read('VirtualAddress',       file, '*u4')
         self.read('SizeOfRawData',        file, '*u4')
-        self.read('NumberOfSymbols',      file, '*u4')
         self.read('PointerToRawData',     file, '*u4')
         self.read('PointerToRelocations', file, '*u4')
+        self.read('PointerToLinenumbers', file, '*u4')
         self.read('NumberOfRelocations',  file, '*u2')
         self.read('NumberOfLinenumbers',  file, '*u2')
         self.read('Characteristics',      file, '*u4')
@@ -155,23 +170,177 @@ class OptionHeader(Struct):
         self.read('Reserved',              file, DirectoriesHeader)
 
 
-class PE(Struct):
+class PE(FileStruct):
     def __init__(self, file, path):
         super().__init__(display=['_FileType'])
 
         self._file = file
         self._path = path
         self._offset  = file.tell()
+        self._mmap = None
+        self._relocations = None
+        self._functions = None
 
         self.read('FileHeader', file, FileHeader)
         self.read('OptionHeader', file, OptionHeader)
+        check_count(file, 'max_sections', self.FileHeader.NumberOfSections, 40)
         self.read('SectionTable', file, [SectionTable for i in range(self.FileHeader.NumberOfSections)])
 
         if self.FileHeader.Characteristics & 0x2000:
             self._FileType = 'DLL'
 
-    def __def__(self):
-        self._file.close()
+    def view(self, offset, size):
+        return view_file(self, offset, size)
+
+    def rva_to_offset(self, rva):
+        if rva < self.OptionHeader.SizeOfHeaders:
+            return rva
+        for section in self.SectionTable:
+            if section.VirtualAddress <= rva < section.VirtualAddress + section.SizeOfRawData:
+                return rva - section.VirtualAddress + section.PointerToRawData
+        return None
+
+    def _file_ranges(self):
+        # (start RVA, end RVA, offset - RVA) of the headers and section data, as rva_to_offset sees them
+        headers = self.OptionHeader.SizeOfHeaders
+        ranges = [(0, headers, 0)] if headers else []
+        for section in sorted(self.SectionTable, key=lambda section: section.VirtualAddress):
+            start, end = max(section.VirtualAddress, headers), section.VirtualAddress + section.SizeOfRawData
+            if start < end and (not ranges or start >= ranges[-1][1]):
+                ranges.append((start, end, section.PointerToRawData - section.VirtualAddress))
+        return ranges
+
+    def view_rva(self, rva, size):
+        offset = self.rva_to_offset(rva)
+        if offset is None:
+            raise ValueError('RVA 0x{0:X} is not backed by file data'.format(rva))
+        return self.view(offset, size)
+
+    def _resource_view(self, offset, size):
+        return self.view_rva(self.OptionHeader.ResourceTable.VirtualAddress + offset, size)
+
+    def resources(self):
+        from .resource import ResourceDirectory
+
+        if self.OptionHeader.ResourceTable.VirtualAddress == 0:
+            return None
+        return ResourceDirectory(self, 0)
+
+    def find_resource(self, type, name=None, lang=None):
+        root = self.resources()
+        return root.find(type, name, lang) if root else None
+
+    def version_info(self):
+        from .resource import RT_VERSION, parse_version_info
+
+        res = self.find_resource(RT_VERSION)
+        return parse_version_info(res.data()) if res else None
+
+    def base_relocations(self):
+        from .reloc import BaseRelocations
+
+        if self._relocations is None:
+            table = self.OptionHeader.BaseRelocationTable
+            self._relocations = BaseRelocations(self.view_rva(table.VirtualAddress, table.Size) if table.VirtualAddress and table.Size else b'')
+        return self._relocations
+
+    def rebase(self, image_base, path=None):
+        from .reloc import relocation_offsets, apply_relocations
+
+        if self.FileHeader.Characteristics & 0x0001:
+            raise ValueError('relocations are stripped from the image')
+
+        # Writable copy of the file, backed by path or by anonymous memory
+        source = mapped(self)
+        if path:
+            with open(path, 'wb+') as file:
+                file.write(source)
+                file.flush()
+                image = mmap.mmap(file.fileno(), 0)
+        else:
+            image = mmap.mmap(-1, len(source))
+            image[:] = source
+
+        relocations = self.base_relocations()
+        offsets = relocation_offsets(relocations, self._file_ranges())
+        apply_relocations(image, relocations, offsets, image_base - self.OptionHeader.ImageBase)
+
+        if self.OptionHeader._image_type == 'PE32':
+            struct.pack_into('<I', image, self.OptionHeader._offset + 28, image_base)
+        else:
+            struct.pack_into('<Q', image, self.OptionHeader._offset + 24, image_base)
+        return image
+
+    def functions(self):
+        from .unwind import FunctionTable
+
+        # Only x64 RUNTIME_FUNCTION entries are decoded
+        if self._functions is None:
+            table = self.OptionHeader.ExceptionTable
+            data = b''
+            if self.FileHeader.Machine == 0x8664 and table.VirtualAddress and table.Size:
+                data = self.view_rva(table.VirtualAddress, table.Size)
+            self._functions = FunctionTable(self, data)
+        return self._functions
+
+    def find_function(self, rva):
+        return self.functions().find(rva)
+
+    def unwind_info(self, rva):
+        function = self.find_function(rva)
+        return self.functions().unwind_info(function) if function else None
+
+    def _integrity_ranges(self):
+        checksum = self.OptionHeader._offset + 64
+        directory = self.OptionHeader._offset + (96 if self.OptionHeader._image_type == 'PE32' else 112) + 4 * 8
+        cert = self.OptionHeader.CertificateTable
+
+        # (start, end, in checksum, in digest)
+        excluded = [(checksum, checksum + 4, False, False), (directory, directory + 8, True, False)]
+        if cert.VirtualAddress and cert.Size:
+            excluded.append((cert.VirtualAddress, cert.VirtualAddress + cert.Size, True, False))
+        return sorted(excluded)
+
+    def integrity(self, algorithm='sha256'):
+        data = memoryview(mapped(self))
+        size = len(data)
+
+        excluded = self._integrity_ranges()
+        digest = hashlib.new(algorithm)
+        total = 0
+
+        pos = 0
+        for start, end, in_checksum, in_digest in excluded + [(size, size, True, True)]:
+            start, end = min(max(start, pos), size), min(end, size)
+            for chunk in range(pos, start, CHUNK_SIZE):
+                piece = data[chunk: min(chunk + CHUNK_SIZE, start)]
+                total += fold_checksum(piece, chunk)
+                digest.update(piece)
+            if start < end:
+                piece = data[start: end]
+                if in_checksum:
+                    total += fold_checksum(piece, start)
+                if in_digest:
+                    digest.update(piece)
+            pos = max(pos, end)
+
+        total %= 0xFFFF
+        if total == 0 and size:
+            total = 0xFFFF
+
+        return {
+            'CheckSum': (total + size) & 0xFFFFFFFF,
+            'Digest':   digest.hexdigest(),
+        }
+
+    def checksum(self):
+        return self.integrity()['CheckSum']
+
+    def verify_checksum(self):
+        return self.OptionHeader.CheckSum == self.checksum()
+
+    def digest(self, algorithm='sha256'):
+        return self.integrity(algorithm)['Digest']
 
     def save(self):
         self._file.seek(self._offset)
@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .utility import map_file
+
+
+class FilePool:
+    # Caps the descriptors held by pooled files, mmaps included since each one dups its fd.
+    def __init__(self, max_open=256):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._pins    = {}
+        self._lock    = threading.RLock()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def _evict(self):
+        for key in list(self._handles):
+            if len(self._handles) < self.max_open:
+                return
+            if key in self._pins:
+                continue
+            handle = self._handles.get(key)
+            try:
+                if handle is not None:
+                    handle.close()
+            except BufferError:
+                # mmaps with exported views stay open until the views are released
+                continue
+            self._handles.pop(key, None)
+
+    def _get(self, key, create):
+        handle = self._handles.get(key)
+        if handle is not None and not handle.closed:
+            self._handles.move_to_end(key)
+            return handle
+
+        self._evict()
+        handle = self._handles[key] = create()
+        return handle
+
+    def file(self, pooled):
+        return self._get((id(pooled), 'file'), lambda: open(pooled.name, pooled.mode))
+
+    def map(self, pooled):
+        # The view is exported under the lock, so eviction cannot close the
+        # mapping until the caller has released it
+        with self._lock:
+            key = (id(pooled), 'map')
+            handle = self._handles.get(key)
+            if handle is not None and not handle.closed:
+                self._handles.move_to_end(key)
+                return memoryview(handle)
+
+            # The descriptor is opened and pinned first, so the room made for
+            # the mapping is not taken by it
+            file = self.pin(pooled)
+            try:
+                self._evict()
+                handle = self._handles[key] = map_file(file)
+            finally:
+                self.unpin(pooled)
+            return memoryview(handle)
+
+    def pin(self, pooled):
+        # A pinned descriptor is skipped by eviction until unpin
+        with self._lock:
+            file = self.file(pooled)
+            key = (id(pooled), 'file')
+            self._pins[key] = self._pins.get(key, 0) + 1
+            return file
+
+    def unpin(self, pooled):
+        with self._lock:
+            key = (id(pooled), 'file')
+            count = self._pins.pop(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+
+    def release(self, pooled):
+        with self._lock:
+            for key in ((id(pooled), 'map'), (id(pooled), 'file')):
+                self._pins.pop(key, None)
+                handle = self._handles.pop(key, None)
+                if handle is not None:
+                    try:
+                        handle.close()
+                    except BufferError:
+                        pass
+
+    def clear(self):
+        with self._lock:
+            self.max_open, max_open = 0, self.max_open
+            self._evict()
+            self.max_open = max_open
+
+
+DEFAULT_POOL = FilePool()
+
+
+class PooledFile:
+    # Read-only file-like object whose descriptor is borrowed from a FilePool
+    # and reopened on demand after eviction.
+    def __init__(self, path, pool=None, mode='rb'):
+        self.name   = path
+        self.mode   = mode
+        self.pool   = pool if pool is not None else DEFAULT_POOL
+        self.closed = False
+        self._pos   = 0
+
+        with self.pool._lock:
+            self.pool.file(self)
+        self.size = os.stat(path).st_size
+
+    def __del__(self):
+        if not getattr(self, 'closed', True):
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check(self):
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+
+    def read(self, size=-1):
+        if size < 0:
+            size = max(self.size - self._pos, 0)
+        data = self.pread(self._pos, size)
+        self._pos += len(data)
+        return data
+
+    def pread(self, offset, size):
+        self._check()
+        if not hasattr(os, 'pread'):
+            with self.pool._lock:
+                file = self.pool.file(self)
+                file.seek(offset)
+                return file.read(size)
+
+        # Only fetching the descriptor is serialized, the read itself runs unlocked
+        file = self.pool.pin(self)
+        try:
+            return os.pread(file.fileno(), size, offset)
+        finally:
+            self.pool.unpin(self)
+
+    def write(self, data):
+        self._check()
+        with self.pool._lock:
+            file = self.pool.file(self)
+            file.seek(self._pos)
+            size = file.write(data)
+            file.flush()
+        self._pos += size
+        self.size = max(self.size, self._pos)
+        return size
+
+    def seek(self, offset, whence=0):
+        self._check()
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self.size
+        self._pos = offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def fileno(self):
+        # Only valid until the next pool operation may evict it, prefer pread
+        self._check()
+        with self.pool._lock:
+            return self.pool.file(self).fileno()
+
+    def mmap(self):
+        self._check()
+        return self.pool.map(self)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pool.release(self)
@@ -0,0 +1,140 @@
+import sys
+import struct
+from array import array
+from bisect import bisect_right
+from collections import deque
+from itertools import compress, repeat
+from operator import add, and_, eq, rshift
+
+BASE_RELOCATION_BLOCK = struct.Struct('<II')
+
+IMAGE_REL_BASED = {
+    0:  'ABSOLUTE',
+    1:  'HIGH',
+    2:  'LOW',
+    3:  'HIGHLOW',
+    4:  'HIGHADJ',
+    10: 'DIR64',
+}
+
+IMAGE_REL_BASED_ABSOLUTE = 0
+IMAGE_REL_BASED_HIGH     = 1
+IMAGE_REL_BASED_LOW      = 2
+IMAGE_REL_BASED_HIGHLOW  = 3
+IMAGE_REL_BASED_DIR64    = 10
+
+# type: (struct code, width)
+RELOCATION_WIDTH = {
+    IMAGE_REL_BASED_HIGHLOW: ('I', 4),
+    IMAGE_REL_BASED_DIR64:   ('Q', 8),
+}
+
+
+class BaseRelocations:
+    def __init__(self, data=b''):
+        self.RVAs   = array('I')
+        self.Types  = array('B')
+        # (page RVA, first index, count)
+        self.Blocks = []
+
+        offset = 0
+        while offset + BASE_RELOCATION_BLOCK.size <= len(data):
+            page, size = BASE_RELOCATION_BLOCK.unpack_from(data, offset)
+            if size < BASE_RELOCATION_BLOCK.size:
+                break
+            end = min(offset + size, len(data))
+
+            entries = array('H', bytes(data[offset + BASE_RELOCATION_BLOCK.size: end - (end - offset) % 2]))
+            if sys.byteorder == 'big':
+                entries.byteswap()
+
+            # The whole block is split with C-level maps, ABSOLUTE entries are padding
+            types = array('B', map(rshift, entries, repeat(12)))
+            used = list(map(bool, types))
+            start = len(self.RVAs)
+            self.RVAs.extend(compress(map(add, map(and_, entries, repeat(0xFFF)), repeat(page)), used))
+            self.Types.extend(compress(types, used))
+            self.Blocks.append((page, start, len(self.RVAs) - start))
+
+            offset += size
+
+    def __len__(self):
+        return len(self.RVAs)
+
+    def __iter__(self):
+        return zip(self.RVAs, self.Types)
+
+    def select(self, type):
+        return array('I', compress(self.RVAs, map(eq, self.Types, repeat(type))))
+
+    def format(self):
+        counts = {}
+        for type in set(self.Types):
+            counts[IMAGE_REL_BASED.get(type, type)] = self.Types.count(type)
+        return {
+            'NumberOfBlocks':      len(self.Blocks),
+            'NumberOfRelocations': len(self),
+            'Types':               counts,
+        }
+
+
+def relocation_offsets(relocations, ranges):
+    # ranges are the file backed parts of the image as sorted (start RVA, end RVA, offset - RVA)
+    starts = [r[0] for r in ranges]
+
+    def find(rva):
+        idx = bisect_right(starts, rva) - 1
+        return ranges[idx] if idx >= 0 and rva < ranges[idx][1] else None
+
+    offsets = array('I')
+    for page, start, count in relocations.Blocks:
+        rvas = relocations.RVAs[start: start + count]
+        if not count:
+            continue
+
+        # Most blocks sit inside one section and are translated in one go
+        r = find(min(rvas))
+        if r is not None and max(rvas) < r[1]:
+            offsets.extend(map(add, rvas, repeat(r[2])))
+            continue
+
+        # With SectionAlignment below the page size a block can span sections
+        for rva in rvas:
+            r = find(rva)
+            if r is None:
+                raise ValueError('relocation at RVA 0x{0:X} is not backed by file data'.format(rva))
+            offsets.append(rva + r[2])
+    return offsets
+
+def apply_relocations(image, relocations, offsets, delta):
+    for type in set(relocations.Types):
+        targets = list(compress(offsets, map(eq, relocations.Types, repeat(type))))
+
+        if type in RELOCATION_WIDTH:
+            code, width = RELOCATION_WIDTH[type]
+            mask = (1 << (8 * width)) - 1
+
+            if sys.byteorder == 'little' and not any(map(and_, targets, repeat(width - 1))):
+                # Aligned targets are gathered, added and scattered through a typed view
+                view = memoryview(image)[: len(image) // width * width].cast(code)
+                try:
+                    index = list(map(rshift, targets, repeat(width.bit_length() - 1)))
+                    values = map(and_, map(add, map(view.__getitem__, index), repeat(delta)), repeat(mask))
+                    deque(map(view.__setitem__, index, values), maxlen=0)
+                finally:
+                    view.release()
+            else:
+                fmt = struct.Struct('<' + code)
+                for offset in targets:
+                    fmt.pack_into(image, offset, (fmt.unpack_from(image, offset)[0] + delta) & mask)
+
+        elif type == IMAGE_REL_BASED_HIGH:
+            for offset in targets:
+                value = struct.unpack_from('<H', image, offset)[0]
+                struct.pack_into('<H', image, offset, (((value << 16) + delta) >> 16) & 0xFFFF)
+        elif type == IMAGE_REL_BASED_LOW:
+            for offset in targets:
+                value = struct.unpack_from('<H', image, offset)[0]
+                struct.pack_into('<H', image, offset, (value + delta) & 0xFFFF)
+        else:
+            raise ValueError('unsupported base relocation type {0}'.format(IMAGE_REL_BASED.get(type, type)))
@@ -0,0 +1,138 @@
+import struct
+
+from .utility import Struct
+
+RESOURCE_DIRECTORY  = struct.Struct('<IIHHHH')
+RESOURCE_ENTRY      = struct.Struct('<II')
+RESOURCE_DATA_ENTRY = struct.Struct('<IIII')
+FIXED_FILE_INFO     = struct.Struct('<IIIIIIIIIIIII')
+
+VS_FIXEDFILEINFO_SIGNATURE = 0xFEEF04BD
+
+RESOURCE_TYPE = {
+    1:  'CURSOR',
+    2:  'BITMAP',
+    3:  'ICON',
+    4:  'MENU',
+    5:  'DIALOG',
+    6:  'STRING',
+    7:  'FONTDIR',
+    8:  'FONT',
+    9:  'ACCELERATOR',
+    10: 'RCDATA',
+    11: 'MESSAGETABLE',
+    12: 'GROUP_CURSOR',
+    14: 'GROUP_ICON',
+    16: 'VERSION',
+    17: 'DLGINCLUDE',
+    19: 'PLUGPLAY',
+    20: 'VXD',
+    21: 'ANICURSOR',
+    22: 'ANIICON',
+    23: 'HTML',
+    24: 'MANIFEST',
+}
+
+RT_VERSION  = 16
+RT_MANIFEST = 24
+
+# type / name / language, deeper trees are malformed
+MAX_RESOURCE_DEPTH = 3
+
+
+def format_version(ms, ls):
+    return '{0}.{1}.{2}.{3}'.format(ms >> 16, ms & 0xFFFF, ls >> 16, ls & 0xFFFF)
+
+
+class ResourceData(Struct):
+    def __init__(self, pe, offset, key):
+        super().__init__()
+
+        self._pe = pe
+        self.Key = key
+        self.OffsetToData, self.Size, self.CodePage, _ = RESOURCE_DATA_ENTRY.unpack_from(pe._resource_view(offset, RESOURCE_DATA_ENTRY.size))
+
+    def data(self):
+        return self._pe.view_rva(self.OffsetToData, self.Size)
+
+
+class ResourceDirectory(Struct):
+    def __init__(self, pe, offset, key=None, level=0):
+        super().__init__(desc={
+            'Key': lambda x: RESOURCE_TYPE.get(x, x) if level == 1 and type(x) == int else x,
+        }, filter=['Entries'])
+
+        self._pe = pe
+        self._offset = offset
+        self._level = level
+        self._entries = None
+        self.Key = key
+
+        header = pe._resource_view(offset, RESOURCE_DIRECTORY.size)
+        self.Characteristics, self.TimeDateStamp, major, minor, named, ids = RESOURCE_DIRECTORY.unpack_from(header)
+        self.NumberOfEntries = named + ids
+
+    def _name(self, offset):
+        length = int.from_bytes(self._pe._resource_view(offset, 2), 'little')
+        return bytes(self._pe._resource_view(offset + 2, length * 2)).decode('utf-16-le', errors='replace')
+
+    def entries(self):
+        if self._entries is None:
+            data = self._pe._resource_view(self._offset + RESOURCE_DIRECTORY.size, self.NumberOfEntries * RESOURCE_ENTRY.size)
+            entries = []
+            for name, offset in RESOURCE_ENTRY.iter_unpack(data):
+                key = self._name(name & 0x7FFFFFFF) if name & 0x80000000 else name
+                entries.append((key, offset))
+            self._entries = entries
+        return [key for key, offset in self._entries]
+
+    def _child(self, key, offset):
+        if offset & 0x80000000:
+            if self._level + 1 >= MAX_RESOURCE_DEPTH:
+                raise ValueError('resource directory nested deeper than {0} levels'.format(MAX_RESOURCE_DEPTH))
+            return ResourceDirectory(self._pe, offset & 0x7FFFFFFF, key, self._level + 1)
+        return ResourceData(self._pe, offset, key)
+
+    def get(self, key):
+        self.entries()
+        for k, offset in self._entries:
+            if k == key or (type(k) == str and type(key) == str and k.upper() == key.upper()):
+                return self._child(k, offset)
+        return None
+
+    def __getitem__(self, key):
+        res = self.get(key)
+        if res is None:
+            raise KeyError(key)
+        return res
+
+    def __iter__(self):
+        self.entries()
+        for key, offset in self._entries:
+            yield self._child(key, offset)
+
+    def find(self, *keys):
+        # Follows the given keys and then the first entry at each remaining level
+        node = self
+        for key in keys:
+            if node is None or type(node) != ResourceDirectory:
+                return None
+            node = node.get(key) if key is not None else next(iter(node), None)
+        while type(node) == ResourceDirectory:
+            node = next(iter(node), None)
+        return node
+
+
+def parse_version_info(data):
+    idx = bytes(data).find(struct.pack('<I', VS_FIXEDFILEINFO_SIGNATURE))
+    if idx < 0 or idx + FIXED_FILE_INFO.size > len(data):
+        return None
+
+    fields = FIXED_FILE_INFO.unpack_from(data, idx)
+    return {
+        'FileVersion':    format_version(fields[2], fields[3]),
+        'ProductVersion': format_version(fields[4], fields[5]),
+        'FileFlags':      fields[7] & fields[6],
+        'FileOS':         fields[8],
+        'FileType':       fields[9],
+    }
@@ -0,0 +1,151 @@
+import sys
+import struct
+from array import array
+from bisect import bisect_right
+
+RUNTIME_FUNCTION = struct.Struct('<III')
+UNWIND_INFO      = struct.Struct('<BBBB')
+
+UNW_FLAG_EHANDLER  = 0x1
+UNW_FLAG_UHANDLER  = 0x2
+UNW_FLAG_CHAININFO = 0x4
+
+UNW_FLAG = {
+    UNW_FLAG_EHANDLER:  'EHANDLER',
+    UNW_FLAG_UHANDLER:  'UHANDLER',
+    UNW_FLAG_CHAININFO: 'CHAININFO',
+}
+
+UWOP_PUSH_NONVOL     = 0
+UWOP_ALLOC_LARGE     = 1
+UWOP_ALLOC_SMALL     = 2
+UWOP_SET_FPREG       = 3
+UWOP_SAVE_NONVOL     = 4
+UWOP_SAVE_NONVOL_FAR = 5
+UWOP_EPILOG          = 6
+UWOP_SPARE           = 7
+UWOP_SAVE_XMM128     = 8
+UWOP_SAVE_XMM128_FAR = 9
+UWOP_PUSH_MACHFRAME  = 10
+
+UWOP = {
+    0:  'PUSH_NONVOL',
+    1:  'ALLOC_LARGE',
+    2:  'ALLOC_SMALL',
+    3:  'SET_FPREG',
+    4:  'SAVE_NONVOL',
+    5:  'SAVE_NONVOL_FAR',
+    6:  'EPILOG',
+    7:  'SPARE',
+    8:  'SAVE_XMM128',
+    9:  'SAVE_XMM128_FAR',
+    10: 'PUSH_MACHFRAME',
+}
+
+REGISTER = ['RAX', 'RCX', 'RDX', 'RBX', 'RSP', 'RBP', 'RSI', 'RDI',
+            'R8',  'R9',  'R10', 'R11', 'R12', 'R13', 'R14', 'R15']
+
+
+def decode_unwind_codes(data, count, version):
+    codes = []
+    slot = 0
+    while slot < count:
+        offset, byte = data[slot * 2], data[slot * 2 + 1]
+        op, info = byte & 0xF, byte >> 4
+        code = {'Offset': offset, 'Op': UWOP.get(op, op)}
+        slot += 1
+
+        if op in (UWOP_PUSH_NONVOL, UWOP_SAVE_NONVOL, UWOP_SAVE_NONVOL_FAR):
+            code['Register'] = REGISTER[info]
+        elif op in (UWOP_SAVE_XMM128, UWOP_SAVE_XMM128_FAR):
+            code['Register'] = 'XMM{0}'.format(info)
+
+        if op == UWOP_ALLOC_SMALL:
+            code['Size'] = info * 8 + 8
+        elif op == UWOP_ALLOC_LARGE and info == 0:
+            code['Size'] = struct.unpack_from('<H', data, slot * 2)[0] * 8
+            slot += 1
+        elif op == UWOP_ALLOC_LARGE:
+            code['Size'] = struct.unpack_from('<I', data, slot * 2)[0]
+            slot += 2
+        elif op == UWOP_SAVE_NONVOL or (op == UWOP_EPILOG and version < 2):
+            # Version 1 used opcode 6 for SAVE_XMM, scaled by 8 like SAVE_NONVOL
+            code['StackOffset'] = struct.unpack_from('<H', data, slot * 2)[0] * 8
+            slot += 1
+        elif op == UWOP_SAVE_NONVOL_FAR or (op == UWOP_SPARE and version < 2):
+            code['StackOffset'] = struct.unpack_from('<I', data, slot * 2)[0]
+            slot += 2
+        elif op == UWOP_SAVE_XMM128:
+            code['StackOffset'] = struct.unpack_from('<H', data, slot * 2)[0] * 16
+            slot += 1
+        elif op == UWOP_SAVE_XMM128_FAR:
+            code['StackOffset'] = struct.unpack_from('<I', data, slot * 2)[0]
+            slot += 2
+        elif op == UWOP_PUSH_MACHFRAME:
+            code['ErrorCode'] = info == 1
+
+        codes.append(code)
+    return codes
+
+
+class FunctionTable:
+    def __init__(self, pe, data=b''):
+        self._pe = pe
+        self._unwind = {}
+
+        # Begin, End and UnwindData interleaved, sorted by Begin
+        self._table = array('I', bytes(data[: len(data) // RUNTIME_FUNCTION.size * RUNTIME_FUNCTION.size]))
+        if sys.byteorder == 'big':
+            self._table.byteswap()
+        self.Begins = self._table[0::3]
+
+    def __len__(self):
+        return len(self.Begins)
+
+    def __getitem__(self, index):
+        return tuple(self._table[index * 3: index * 3 + 3])
+
+    def __iter__(self):
+        table = self._table
+        return zip(table[0::3], table[1::3], table[2::3])
+
+    def find(self, rva):
+        idx = bisect_right(self.Begins, rva) - 1
+        if idx < 0:
+            return None
+        function = self[idx]
+        return function if rva < function[1] else None
+
+    def unwind_info(self, function):
+        rva = function[2] if type(function) == tuple else function
+        info = self._unwind.get(rva)
+        if info is None:
+            info = self._unwind[rva] = self._decode(rva)
+        return info
+
+    def _decode(self, rva):
+        pe = self._pe
+        header, prolog, count, frame = UNWIND_INFO.unpack_from(pe.view_rva(rva, UNWIND_INFO.size))
+        version, flags = header & 0x7, header >> 3
+        codes = pe.view_rva(rva + UNWIND_INFO.size, count * 2)
+
+        info = {
+            'Version':       version,
+            'Flags':         [v for k, v in UNW_FLAG.items() if flags & k],
+            'SizeOfProlog':  prolog,
+            'CountOfCodes':  count,
+            'FrameRegister': REGISTER[frame & 0xF] if frame & 0xF else None,
+            'FrameOffset':   (frame >> 4) * 16,
+            'UnwindCodes':   decode_unwind_codes(codes, count, version),
+        }
+
+        # Handler or chained function follow the codes, padded to an even count
+        tail = rva + UNWIND_INFO.size + ((count + 1) & ~1) * 2
+        if flags & UNW_FLAG_CHAININFO:
+            info['Chained'] = RUNTIME_FUNCTION.unpack_from(pe.view_rva(tail, RUNTIME_FUNCTION.size))
+        elif flags & (UNW_FLAG_EHANDLER | UNW_FLAG_UHANDLER):
+            info['ExceptionHandler'] = struct.unpack_from('<I', pe.view_rva(tail, 4))[0]
+        return info
+
+    def format(self):
+        return [{'BeginAddress': '{0:X}'.format(b), 'EndAddress': '{0:X}'.format(e), 'UnwindData': '{0:X}'.format(u)} for b, e, u in self]
@@ -1,5 +1,9 @@
+import os
 import sys
 import json
+import mmap
+import struct
+import threading
 
 BYTE_ORDER = {
     '*': sys.byteorder,
@@ -29,10 +33,36 @@ def read_string(file, opt, len):
         res = fread(file, int(len))
     res = bytes.decode(res.strip(b'\0 '), errors="strict")
     if opt == 'i':
-        res = int(res)
+        res = int(res) if res else 0
 
     return res
 
+STRUCT_ORDER = {
+    '*': '=',
+    '+': '>',
+    '-': '<',
+}
+
+STRUCT_CODE = {
+    'u1': 'B', 'u2': 'H', 'u4': 'I', 'u8': 'Q',
+    'i1': 'b', 'i2': 'h', 'i4': 'i', 'i8': 'q',
+}
+
+def array_format(form, count):
+    return STRUCT_ORDER[form[0]] + str(count) + STRUCT_CODE[form[1:]]
+
+def read_array(file, form, count):
+    fmt = array_format(form, count)
+    size = struct.calcsize(fmt)
+    data = file.read(size)
+    if len(data) < size:
+        raise EOFError
+    return list(struct.unpack(fmt, data))
+
+def read_strings(file, size, count):
+    data = file.read(size)
+    return [bytes.decode(s) for s in data.split(b'\0', count)[:count]]
+
 READ_BYTE = {
     'u': lambda f, o, x: int.from_bytes(fread(f, int(x)), BYTE_ORDER[o]),
     'i': lambda f, o, x: int.from_bytes(fread(f, int(x)), BYTE_ORDER[o], signed=True),
@@ -44,13 +74,15 @@ def read(file, form, initvars=None):
         var = READ_BYTE[form[1]](file, form[0], form[2:])
     elif type(form) == type:
         var = form(file, initvars) if initvars else form(file)
+    elif type(form) == tuple:
+        var = read_array(file, form[0], form[1])
     elif type(form) == list:
         var = []
         for v in form:
             try:
                 var.append(read(file, v, initvars))
             except EOFError:
-                pass
+                break
     return var
 
 def from_bytes(obj, file, export):
@@ -104,12 +136,82 @@ def format(obj, keys, desc):
 
     return res
 
-def read_bytes(file, offset, len):
-    cur_offset = file.tell()
-    data = file.read(len)
-    file.seek(cur_offset)
+FILE_LOCK = threading.Lock()
+
+def pread(file, offset, len):
+    # Positional reads leave the shared file cursor alone
+    if hasattr(file, 'pread'):
+        return file.pread(offset, len)
+    if hasattr(os, 'pread'):
+        return os.pread(file.fileno(), len, offset)
+
+    with FILE_LOCK:
+        cur_offset = file.tell()
+        file.seek(offset)
+        data = file.read(len)
+        file.seek(cur_offset)
     return data
 
+def read_bytes(file, offset, len):
+    return pread(file, offset, len)
+
+
+class PositionalReader:
+    # File-like object with a private cursor, for parsing from a shared file
+    def __init__(self, file, offset=0):
+        self._file   = file
+        self._offset = offset
+
+    def read(self, size=-1):
+        if size < 0:
+            total = getattr(self._file, 'size', None)
+            if total is None:
+                total = os.fstat(self._file.fileno()).st_size
+            size = max(total - self._offset, 0)
+        data = read_bytes(self._file, self._offset, size)
+        self._offset += len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        self._offset = offset if whence == 0 else self._offset + offset
+        return self._offset
+
+    def tell(self):
+        return self._offset
+
+    def fileno(self):
+        return self._file.fileno()
+
+def map_file(file):
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def mapped(obj):
+    # Pooled files own their mapping so the pool can account for it
+    if hasattr(obj._file, 'mmap'):
+        return obj._file.mmap()
+    if getattr(obj, '_mmap', None) is None:
+        with FILE_LOCK:
+            if getattr(obj, '_mmap', None) is None:
+                obj._mmap = map_file(obj._file)
+    return obj._mmap
+
+def view_bytes(data, offset, size):
+    view = memoryview(data)[offset: offset + size]
+    if offset < 0 or len(view) < size:
+        raise ValueError('0x{0:X} bytes at 0x{1:X} are outside the file'.format(size, offset))
+    return view
+
+def view_file(obj, offset, size):
+    # Pooled files are read into copies, a view exported from the pool's
+    # mapping would keep eviction from closing it
+    if not hasattr(obj._file, 'mmap'):
+        return view_bytes(mapped(obj), offset, size)
+
+    data = pread(obj._file, offset, size) if offset >= 0 else b''
+    if len(data) < size:
+        raise ValueError('0x{0:X} bytes at 0x{1:X} are outside the file'.format(size, offset))
+    return memoryview(data)
+
 
 class Struct:
     def __init__(self, desc={}, display=[], filter=[], initvars=None):
@@ -141,6 +243,29 @@ class Struct:
     def to_bytes(self):
         return to_bytes(self, self._export)
 
+class FileStruct(Struct):
+    # Parsed file that owns its source, usable as a context manager
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        view, self._mmap = getattr(self, '_mmap', None), None
+        if view is not None:
+            try:
+                view.close()
+            except BufferError:
+                # Views are still exported, the mapping closes once they are released
+                pass
+        file = getattr(self, '_file', None)
+        if file is not None:
+            file.close()
+
 class Version:
     def __init__(self, file, export):
         self._export = export
@@ -17,6 +17,9 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     platforms="any",
+    entry_points={
+        "console_scripts": ["pycoff = pycoff.cli:main"],
+    },
     classifiers={
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: BSD License",
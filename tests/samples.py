@@ -0,0 +1,226 @@
+import struct
+
+# Builders for the small images the tests parse, so no binaries are checked in
+
+
+def align(value, alignment):
+    return -(-value // alignment) * alignment
+
+
+def pe_checksum(image, checksum_offset):
+    # Reference end-around carry sum of 16-bit words, the checksum field counted as zero
+    data = bytearray(image)
+    data[checksum_offset: checksum_offset + 4] = bytes(4)
+    if len(data) % 2:
+        data.append(0)
+
+    total = 0
+    for (word,) in struct.iter_unpack('<H', data):
+        total += word
+        total = (total & 0xFFFF) + (total >> 16)
+    return (total + len(image)) & 0xFFFFFFFF
+
+
+def build_pe(sections, relocations=None, image_base=0x140000000, plus=True,
+             section_alignment=0x200, file_alignment=0x200, certificate=b'', fix_checksum=False):
+    # sections: [(name, rva, raw offset, data)], relocations: {page rva: [(type, page offset)]}
+    sections = list(sections)
+
+    blocks = b''
+    for page, entries in sorted((relocations or {}).items()):
+        words = [(kind << 12) | offset for kind, offset in entries]
+        if len(words) % 2:
+            words.append(0)
+        blocks += struct.pack('<II', page, 8 + 2 * len(words)) + struct.pack('<%dH' % len(words), *words)
+    if blocks:
+        rva = align(max(rva + len(data) for name, rva, raw, data in sections), section_alignment)
+        raw = align(max(raw + len(data) for name, rva, raw, data in sections), file_alignment)
+        sections.append((b'.reloc', rva, raw, blocks))
+
+    opt_size = 240 if plus else 224
+    size_of_headers = align(0x58 + opt_size + 40 * len(sections), file_alignment)
+    size_of_image = align(max(rva + len(data) for name, rva, raw, data in sections), section_alignment)
+    end = align(max(raw + len(data) for name, rva, raw, data in sections), file_alignment)
+
+    directories = [(0, 0)] * 16
+    if certificate:
+        directories[4] = (end, len(certificate))
+    if blocks:
+        directories[5] = (sections[-1][1], len(blocks))
+
+    opt = struct.pack('<HBBIIIII', 0x20b if plus else 0x10b, 14, 0, 0, 0, 0, 0, 0)
+    opt += struct.pack('<Q', image_base) if plus else struct.pack('<II', 0, image_base)
+    opt += struct.pack('<IIHHHHHHIIIIHH', section_alignment, file_alignment, 6, 0, 0, 0, 6, 0, 0,
+                       size_of_image, size_of_headers, 0, 3, 0x8160)
+    opt += struct.pack('<QQQQ' if plus else '<IIII', 0x100000, 0x1000, 0x100000, 0x1000)
+    opt += struct.pack('<II', 0, 16) + b''.join(struct.pack('<II', *d) for d in directories)
+
+    image = bytearray(max(size_of_headers, end))
+    image[0:2] = b'MZ'
+    struct.pack_into('<I', image, 0x3c, 0x40)
+    image[0x40:0x44] = b'PE\0\0'
+    struct.pack_into('<HHIIIHH', image, 0x44, 0x8664 if plus else 0x14c, len(sections), 0, 0, 0,
+                     opt_size, 0x22 if plus else 0x102)
+    image[0x58: 0x58 + opt_size] = opt
+
+    pos = 0x58 + opt_size
+    for name, rva, raw, data in sections:
+        struct.pack_into('<8sIIIIIIHHI', image, pos, name, len(data), rva, len(data), raw, 0, 0, 0, 0, 0x60000020)
+        image[raw: raw + len(data)] = data
+        pos += 40
+    image += certificate
+
+    if fix_checksum:
+        struct.pack_into('<I', image, 0x58 + 64, pe_checksum(image, 0x58 + 64))
+    return bytes(image)
+
+
+def ar_header(name, size):
+    return (name.ljust(16) + b'0'.ljust(12) + b'0'.ljust(6) + b'0'.ljust(6) + b'100644'.ljust(8)
+            + str(size).encode().ljust(10) + b'`\n')
+
+
+def ar_member(name, data):
+    return ar_header(name, len(data)) + data + b'\n' * (len(data) % 2)
+
+
+def build_gnu_archive(members, width=4):
+    # members: [(name, data, [symbols])], names past 15 bytes go to the '//' member
+    longnames = b''
+    names = []
+    for name, data, symbols in members:
+        if len(name) > 15:
+            names.append(b'/' + str(len(longnames)).encode())
+            longnames += name + b'/\n'
+        else:
+            names.append(name + b'/')
+
+    symbols = [(symbol, i) for i, (name, data, syms) in enumerate(members) for symbol in syms]
+    table_size = width * (1 + len(symbols)) + sum(len(symbol) + 1 for symbol, i in symbols)
+    offset = 8 + 60 + align(table_size, 2)
+    if longnames:
+        offset += 60 + align(len(longnames), 2)
+
+    offsets = []
+    for name, data, syms in members:
+        offsets.append(offset)
+        offset += 60 + align(len(data), 2)
+
+    code = '>I' if width == 4 else '>Q'
+    table = struct.pack(code, len(symbols)) + b''.join(struct.pack(code, offsets[i]) for symbol, i in symbols)
+    table += b''.join(symbol + b'\0' for symbol, i in symbols)
+
+    archive = b'!<arch>\n' + ar_member(b'/' if width == 4 else b'/SYM64/', table)
+    if longnames:
+        archive += ar_member(b'//', longnames)
+    for name, (member, data, syms) in zip(names, members):
+        archive += ar_member(name, data)
+    return archive, offsets
+
+
+def bsd_member(name, data):
+    # BSD keeps the name, padded to 4 bytes, in front of the data
+    name = name + bytes(-len(name) % 4 or 4)
+    return ar_header(b'#1/' + str(len(name)).encode(), len(name) + len(data)) + name + data + b'\n' * ((len(name) + len(data)) % 2)
+
+
+def build_bsd_archive(members, width=4):
+    code = '<I' if width == 4 else '<Q'
+    symbols = [(symbol, i) for i, (name, data, syms) in enumerate(members) for symbol in syms]
+
+    strtab = b''
+    strx = []
+    for symbol, i in symbols:
+        strx.append(len(strtab))
+        strtab += symbol + b'\0'
+    strtab += bytes(-len(strtab) % width)
+
+    name = b'__.SYMDEF SORTED' if width == 4 else b'__.SYMDEF_64'
+    table_size = len(bsd_member(name, bytes(width * (2 + 2 * len(symbols)) + len(strtab))))
+    offset = 8 + table_size
+
+    offsets = []
+    for member, data, syms in members:
+        offsets.append(offset)
+        offset += len(bsd_member(member, data))
+
+    table = struct.pack(code, 2 * width * len(symbols))
+    table += b''.join(struct.pack(code, strx[k]) + struct.pack(code, offsets[i]) for k, (symbol, i) in enumerate(symbols))
+    table += struct.pack(code, len(strtab)) + strtab
+
+    archive = b'!<arch>\n' + bsd_member(name, table)
+    for member, data, syms in members:
+        archive += bsd_member(member, data)
+    return archive, offsets
+
+
+def import_object(symbol, dll, machine=0x8664, ordinal=0, kind=0, name_type=1):
+    names = symbol + b'\0' + dll + b'\0'
+    return struct.pack('<HHHHIIHH', 0, 0xFFFF, 0, machine, 0, len(names), ordinal, kind | name_type << 2) + names
+
+
+def build_ms_archive(members):
+    # Both linker members, '//' with NUL terminated names and one import object per member
+    longnames = b''
+    names = []
+    for name, data, symbols in members:
+        names.append(b'/' + str(len(longnames)).encode())
+        longnames += name + b'\0'
+
+    symbols = [(symbol, i) for i, (name, data, syms) in enumerate(members) for symbol in syms]
+    strings = b''.join(symbol + b'\0' for symbol, i in symbols)
+    first_size = 4 * (1 + len(symbols)) + len(strings)
+    second_size = 4 + 4 * len(members) + 4 + 2 * len(symbols) + len(strings)
+
+    offset = 8 + 60 + align(first_size, 2) + 60 + align(second_size, 2) + 60 + align(len(longnames), 2)
+    offsets = []
+    for name, data, syms in members:
+        offsets.append(offset)
+        offset += 60 + align(len(data), 2)
+
+    first = struct.pack('>I', len(symbols)) + b''.join(struct.pack('>I', offsets[i]) for symbol, i in symbols) + strings
+    second = struct.pack('<I', len(members)) + struct.pack('<%dI' % len(members), *offsets)
+    second += struct.pack('<I', len(symbols)) + b''.join(struct.pack('<H', i + 1) for symbol, i in symbols) + strings
+
+    archive = b'!<arch>\n' + ar_member(b'/', first) + ar_member(b'/', second) + ar_member(b'//', longnames)
+    for name, (member, data, syms) in zip(names, members):
+        archive += ar_member(name, data)
+    return archive, offsets
+
+
+def build_obj(sections, symbols, machine=0x8664):
+    # sections: [(name, data, [(offset, symbol index, type)])], symbols: [(name, value, section, type, class, [aux])]
+    strtab = b''
+    table = b''
+    for name, value, section, kind, storage, aux in symbols:
+        if len(name) > 8:
+            field = struct.pack('<II', 0, 4 + len(strtab))
+            strtab += name + b'\0'
+        else:
+            field = name.ljust(8, b'\0')
+        table += struct.pack('<8sIhHBB', field, value, section, kind, storage, len(aux)) + b''.join(aux)
+
+    offset = 20 + 40 * len(sections)
+    headers = b''
+    body = b''
+    for name, data, relocations in sections:
+        pointer = offset + len(body)
+        body += data
+        relocs = offset + len(body) if relocations else 0
+        body += b''.join(struct.pack('<IIH', *r) for r in relocations)
+        headers += struct.pack('<8sIIIIIIHHI', name, 0, 0, len(data), pointer, relocs, 0, len(relocations), 0, 0x60500020)
+
+    count = len(table) // 18
+    header = struct.pack('<HHIIIHH', machine, len(sections), 0, offset + len(body), count, 0, 0)
+    return header + headers + body + table + struct.pack('<I', 4 + len(strtab)) + strtab
+
+
+def build_elf_header(phnum=0, shnum=0, elf_class=2):
+    # Header only, with the tables claimed right behind it
+    size = 64 if elf_class == 2 else 52
+    ident = b'\x7fELF' + bytes([elf_class, 1, 1]) + bytes(9)
+    if elf_class == 2:
+        return ident + struct.pack('<HHIQQQIHHHHHH', 2, 0x3E, 1, 0, size if phnum else 0, size if shnum else 0,
+                                   0, size, 56, phnum, 64, shnum, 0)
+    return ident + struct.pack('<HHIIIIIHHHHHH', 2, 3, 1, 0, size if phnum else 0, size if shnum else 0,
+                               0, size, 32, phnum, 40, shnum, 0)
@@ -0,0 +1,67 @@
+import pytest
+
+import pycoff
+from samples import build_bsd_archive, build_gnu_archive, build_ms_archive, import_object
+
+MEMBERS = [
+    (b'a.o', b'first member\n', [b'alpha', b'beta']),
+    (b'averyveryverylongname.o', b'second', [b'gamma']),
+    (b'c.o', b'x', []),
+]
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def check_members(ar, offsets, members):
+    assert [member.format()['Name'] for member in ar.ObjectFiles] == [name.decode() for name, data, symbols in members]
+    assert [ar.read_member(member) for member in ar.ObjectFiles] == [data for name, data, symbols in members]
+
+    expected = {symbol.decode(): offsets[i] for i, (name, data, symbols) in enumerate(members) for symbol in symbols}
+    assert ar.symbols() == expected
+    for i, (name, data, symbols) in enumerate(members):
+        for symbol in symbols:
+            assert ar.find_symbol(symbol.decode()).format()['Name'] == name.decode()
+            assert ar.read_member(symbol.decode()) == data
+
+
+@pytest.mark.parametrize('width', [4, 8])
+def test_gnu_archive(tmp_path, width):
+    data, offsets = build_gnu_archive(MEMBERS, width)
+    ar = pycoff.parser(write(tmp_path, 'gnu.a', data))
+    assert ar._Format == 'GNU'
+    check_members(ar, offsets, MEMBERS)
+
+
+@pytest.mark.parametrize('width', [4, 8])
+def test_bsd_archive(tmp_path, width):
+    data, offsets = build_bsd_archive(MEMBERS, width)
+    ar = pycoff.parser(write(tmp_path, 'bsd.a', data))
+    assert ar._Format == 'BSD'
+    check_members(ar, offsets, MEMBERS)
+
+
+def test_ms_archive(tmp_path):
+    members = [
+        (b'kernel32.dll', import_object(b'CreateFileW', b'kernel32.dll', ordinal=3), [b'__imp_CreateFileW', b'CreateFileW']),
+        (b'kernel32.dll', import_object(b'_ExitProcess@4', b'kernel32.dll', name_type=3), [b'_ExitProcess@4']),
+        (b'user32.dll', import_object(b'gValue', b'user32.dll', kind=1, name_type=0, ordinal=7), [b'gValue']),
+    ]
+    data, offsets = build_ms_archive(members)
+    ar = pycoff.parser(write(tmp_path, 'ms.lib', data))
+    assert ar._Format == 'Microsoft'
+    check_members(ar, offsets, members)
+
+    imports = ar.imports()
+    assert [(imp.Symbol, imp.Dll, imp.Ordinal, imp.Type, imp.Name) for imp in imports] == [
+        ('CreateFileW', 'kernel32.dll', 3, 0, 'CreateFileW'),
+        ('_ExitProcess@4', 'kernel32.dll', 0, 0, 'ExitProcess'),
+        ('gValue', 'user32.dll', 7, 1, None),
+    ]
+    assert [len(imports.dll(dll)) for dll in ('KERNEL32.dll', 'user32.dll')] == [2, 1]
+
+    with open(write(tmp_path, 'copy.lib', data), 'rb') as file:
+        assert len(pycoff.read_import_table(file)) == 3
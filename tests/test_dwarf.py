@@ -0,0 +1,65 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import pycoff
+from pycoff.dwarf import LineTable
+
+pytestmark = pytest.mark.skipif(not (shutil.which('gcc') and shutil.which('addr2line')), reason='gcc and addr2line are needed')
+
+SOURCES = {
+    'inc/square.h': 'static inline int square(int x)\n{\n    return x * x;\n}\n',
+    'sub/f.c': '#include "../inc/square.h"\nint f(int a)\n{\n    int b = square(a);\n    return b + 1;\n}\n',
+    'main.c': '#include "inc/square.h"\nint f(int);\nint main(void)\n{\n    int r = f(3);\n    return square(r) & 1;\n}\n',
+}
+
+
+def build(tmp_path, version):
+    for name, text in SOURCES.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+
+    # Relative sources so that the line table depends on the compilation directory
+    out = str(tmp_path / 'dwarf{0}'.format(version))
+    subprocess.run(['gcc', '-O0', '-gdwarf-{0}'.format(version), '-o', out, 'main.c', 'sub/f.c'], cwd=str(tmp_path), check=True)
+    return out
+
+
+def rows(table):
+    return sorted({address for seq in table._index[1] for address in seq.Addresses} - {seq.End for seq in table._index[1]})
+
+
+@pytest.mark.parametrize('version', [2, 3, 4])
+def test_rows_match_addr2line(tmp_path, version):
+    path = build(tmp_path, version)
+    table = pycoff.parser(path).line_table().decode_all()
+    addresses = rows(table)
+    assert addresses
+
+    output = subprocess.run(['addr2line', '-e', path] + ['0x{0:x}'.format(a) for a in addresses],
+                            capture_output=True, text=True, check=True).stdout.splitlines()
+    for address, line in zip(addresses, output):
+        name, number = line.rsplit(':', 1)
+        assert table.lookup(address) == (name, int(number.split()[0]))
+
+    files = {name for name in table.Files if name}
+    assert all(os.path.isabs(name) and os.path.exists(name) for name in files)
+    assert os.path.join(str(tmp_path), 'sub', 'f.c') in files
+
+
+def test_cache_round_trip(tmp_path):
+    elf = pycoff.parser(build(tmp_path, 4))
+    cache = str(tmp_path / 'lines.cache')
+    table = elf.line_table(cache)
+    cached = elf.line_table(cache)
+
+    assert cached is not table and cached.Files == table.Files
+    for address in rows(table.decode_all()):
+        assert cached.lookup(address) == table.lookup(address)
+
+    with open(cache, 'r+b') as file:
+        file.truncate(os.path.getsize(cache) - 3)
+    assert LineTable.load(cache, table.key()) is None
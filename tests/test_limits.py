@@ -0,0 +1,60 @@
+import struct
+
+import pytest
+
+import pycoff
+from pycoff.note import read_notes
+from samples import build_elf_header, build_gnu_archive, build_obj, build_pe
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def parse_error(path, limits=None):
+    with pytest.raises(pycoff.LimitExceeded) as error:
+        pycoff.parser(path, limits)
+    return error.value
+
+
+def test_pe_section_count(tmp_path):
+    image = bytearray(build_pe([(b'.text', 0x1000, 0x200, bytes(0x200))], section_alignment=0x1000))
+    struct.pack_into('<H', image, 0x46, 0xFFFF)
+    error = parse_error(write(tmp_path, 'a.exe', bytes(image)))
+    assert error.limit == 'file_size' and error.value == 0xFFFF * 40
+
+
+def test_obj_symbol_count(tmp_path):
+    data = bytearray(build_obj([(b'.text', bytes(16), [])], [(b'main', 0, 1, 0x20, 2, [])]))
+    struct.pack_into('<I', data, 12, 0x100000)
+    assert parse_error(write(tmp_path, 'a.obj', bytes(data))).limit == 'file_size'
+
+    struct.pack_into('<I', data, 12, 2)
+    assert parse_error(write(tmp_path, 'b.obj', bytes(data)), pycoff.Limits(max_symbols=1)).limit == 'max_symbols'
+
+
+@pytest.mark.parametrize('elf_class', [1, 2])
+def test_elf_header_counts(tmp_path, elf_class):
+    path = write(tmp_path, 'ph', build_elf_header(phnum=0xFFFF, elf_class=elf_class))
+    assert parse_error(path).limit == 'file_size'
+    with open(path, 'rb') as file, pytest.raises(pycoff.LimitExceeded):
+        read_notes(pycoff.BoundedFile(file))
+
+    path = write(tmp_path, 'sh', build_elf_header(shnum=0xFFFF, elf_class=elf_class))
+    assert parse_error(path).limit == 'file_size'
+    with open(path, 'rb') as file, pytest.raises(pycoff.LimitExceeded):
+        read_notes(pycoff.BoundedFile(file))
+
+
+def test_archive_symbol_count(tmp_path):
+    data, offsets = build_gnu_archive([(b'a.o', b'data', [b'alpha'])])
+    data = bytearray(data)
+    struct.pack_into('>I', data, 68, 0x100000)
+    assert parse_error(write(tmp_path, 'a.a', bytes(data))).limit == 'file_size'
+
+
+def test_read_budget(tmp_path):
+    path = write(tmp_path, 'a.exe', build_pe([(b'.text', 0x1000, 0x200, bytes(0x200))], section_alignment=0x1000))
+    assert parse_error(path, pycoff.Limits(max_total_read=64)).limit == 'max_total_read'
@@ -0,0 +1,105 @@
+import re
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+import pycoff
+from pycoff.obj import decode_aux
+from samples import build_obj
+
+AMD64_RELOCATION = {1: 'IMAGE_REL_AMD64_ADDR64', 2: 'IMAGE_REL_AMD64_ADDR32', 4: 'IMAGE_REL_AMD64_REL32'}
+
+SYMBOLS = [
+    (b'.file', 0, -2, 0, 103, [b'sample.c'.ljust(18, b'\0')]),
+    (b'.text', 0, 1, 0, 3, [struct.pack('<IHHIHB', 0x20, 2, 0, 0x1234, 0, 0).ljust(18, b'\0')]),
+    (b'.data', 0, 2, 0, 3, [struct.pack('<IHHIHB', 0x10, 1, 0, 0, 0, 0).ljust(18, b'\0')]),
+    (b'main', 0, 1, 0x20, 2, [struct.pack('<IIII', 0, 0x10, 0, 0).ljust(18, b'\0')]),
+    (b'ext_func', 0, 0, 0x20, 2, []),
+    (b'a_rather_long_symbol_name', 8, 2, 0, 2, []),
+    (b'weak_alias', 0, 0, 0, 105, [struct.pack('<II', 9, 3).ljust(18, b'\0')]),
+    (b'label', 0x18, 1, 0, 3, []),
+]
+
+SECTIONS = [
+    (b'.text', bytes(range(0x20)), [(0x04, 8, 4), (0x10, 4, 1)]),
+    (b'.data', bytes(0x10), [(0x00, 9, 1)]),
+]
+
+
+@pytest.fixture
+def obj_path(tmp_path):
+    path = tmp_path / 'sample.obj'
+    path.write_bytes(build_obj(SECTIONS, SYMBOLS))
+    return str(path)
+
+
+def test_symbols_and_aux(obj_path):
+    obj = pycoff.parser(obj_path)
+    assert [(s.Index, s.Name, s.Value, s.SectionNumber, s.Type, s.StorageClass, len(s.Aux)) for s in obj.Symbols] == [
+        (0, '.file', 0, -2, 0, 103, 1),
+        (2, '.text', 0, 1, 0, 3, 1),
+        (4, '.data', 0, 2, 0, 3, 1),
+        (6, 'main', 0, 1, 0x20, 2, 1),
+        (8, 'ext_func', 0, 0, 0x20, 2, 0),
+        (9, 'a_rather_long_symbol_name', 8, 2, 0, 2, 0),
+        (10, 'weak_alias', 0, 0, 0, 105, 1),
+        (12, 'label', 0x18, 1, 0, 3, 0),
+    ]
+
+    aux = [decode_aux(s) for s in obj.Symbols]
+    assert aux[0] == {'FileName': 'sample.c'}
+    assert aux[1] == {'Length': 0x20, 'NumberOfRelocations': 2, 'NumberOfLinenumbers': 0, 'CheckSum': 0x1234, 'Number': 0, 'Selection': 0}
+    assert aux[3]['TotalSize'] == 0x10
+    assert aux[6] == {'TagIndex': 9, 'Characteristics': 3}
+
+    assert [[(r.VirtualAddress, obj.symbol(r.SymbolTableIndex).Name, r.Type) for r in relocs] for relocs in obj.Relocations] == [
+        [(0x04, 'ext_func', 4), (0x10, '.data', 1)],
+        [(0x00, 'a_rather_long_symbol_name', 1)],
+    ]
+
+
+@pytest.mark.skipif(not shutil.which('objdump'), reason='objdump is not installed')
+def test_matches_objdump(obj_path):
+    output = subprocess.run(['objdump', '-t', '-r', obj_path], capture_output=True, text=True)
+    if 'file format pe-x86-64' not in output.stdout:
+        pytest.skip('objdump has no pe-x86-64 support')
+
+    obj = pycoff.parser(obj_path)
+    lines = output.stdout.splitlines()
+
+    symbols = []
+    scnlen = {}
+    for i, line in enumerate(lines):
+        m = re.match(r'\[\s*(\d+)\]\(sec\s+(-?\d+)\)\(fl 0x[0-9a-f]+\)\(ty\s+([0-9a-f]+)\)\(scl\s+(\d+)\) \(nx (\d+)\) 0x([0-9a-f]+) (.*)', line)
+        if m:
+            symbols.append((int(m[1]), m[7], int(m[6], 16), int(m[2]), int(m[3], 16), int(m[4]), int(m[5])))
+        m = re.match(r'AUX scnlen 0x([0-9a-f]+) nreloc (\d+) nlnno (\d+)(?: checksum 0x([0-9a-f]+))?', line)
+        if m:
+            scnlen[symbols[-1][0]] = (int(m[1], 16), int(m[2]), int(m[3]), int(m[4] or '0', 16))
+
+    # objdump names file symbols after their aux record
+    assert symbols == [(s.Index, decode_aux(s)['FileName'] if s.StorageClass == 103 else s.Name, s.Value,
+                        s.SectionNumber, s.Type, s.StorageClass, len(s.Aux)) for s in obj.Symbols]
+    for index, values in scnlen.items():
+        aux = decode_aux(obj.symbol(index))
+        assert values == (aux['Length'], aux['NumberOfRelocations'], aux['NumberOfLinenumbers'], aux['CheckSum'])
+    assert sorted(scnlen) == [2, 4]
+
+    relocations = {}
+    section = None
+    for line in lines:
+        m = re.match(r'RELOCATION RECORDS FOR \[(.*)\]:', line)
+        if m:
+            section = relocations.setdefault(m[1], [])
+            continue
+        m = re.match(r'([0-9a-f]{8,}) (\S+)\s+(\S+)', line)
+        if m and section is not None:
+            # Symbol values show up as a negative addend
+            section.append((int(m[1], 16), m[2], re.sub(r'-0x[0-9a-f]+$', '', m[3])))
+
+    assert relocations == {
+        header.Name: [(r.VirtualAddress, AMD64_RELOCATION[r.Type], obj.symbol(r.SymbolTableIndex).Name) for r in relocs]
+        for header, relocs in zip(obj.Sections, obj.Relocations)
+    }
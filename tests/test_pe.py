@@ -0,0 +1,77 @@
+import hashlib
+import struct
+
+import pytest
+
+import pycoff
+from samples import build_pe, pe_checksum
+
+CHECKSUM = 0x58 + 64
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def code(size, fill):
+    return bytes((fill + i) & 0xFF for i in range(size))
+
+
+@pytest.mark.parametrize('tail', [0, 1, 3])
+def test_checksum_matches_stored(tmp_path, tail):
+    # Odd tails check the padding of the last word
+    image = bytearray(build_pe([(b'.text', 0x1000, 0x200, code(0x400, 7))], section_alignment=0x1000) + code(tail, 0xF0))
+    struct.pack_into('<I', image, CHECKSUM, pe_checksum(image, CHECKSUM))
+
+    pe = pycoff.parser(write(tmp_path, 'a.exe', bytes(image)))
+    assert pe.checksum() == pe.OptionHeader.CheckSum
+    assert pe.verify_checksum()
+
+    image[0x300] ^= 0xFF
+    assert not pycoff.parser(write(tmp_path, 'b.exe', bytes(image))).verify_checksum()
+
+
+def test_digest_skips_checksum_directory_and_certificate(tmp_path):
+    certificate = struct.pack('<IHH', 24, 0x200, 2) + code(16, 0x33)
+    image = build_pe([(b'.text', 0x1000, 0x200, code(0x300, 1))], section_alignment=0x1000,
+                     certificate=certificate, fix_checksum=True)
+    pe = pycoff.parser(write(tmp_path, 'signed.exe', image))
+
+    directory = 0x58 + 112 + 4 * 8
+    cert = pe.OptionHeader.CertificateTable.VirtualAddress
+    included = image[:CHECKSUM] + image[CHECKSUM + 4: directory] + image[directory + 8: cert]
+    assert cert + len(certificate) == len(image)
+    assert pe.digest() == hashlib.sha256(included).hexdigest()
+    assert pe.integrity('sha1')['Digest'] == hashlib.sha1(included).hexdigest()
+    assert pe.verify_checksum()
+
+
+@pytest.mark.parametrize('plus', [True, False])
+def test_rebase_moves_every_target_by_delta(tmp_path, plus):
+    kind, width, fmt = (10, 8, '<Q') if plus else (3, 4, '<I')
+    base, new_base = (0x140000000, 0x7FF612340000) if plus else (0x400000, 0x10000000)
+
+    # 0x200 alignment puts .text, .data and a gap in the same 4K page block
+    text = bytearray(code(0x200, 0x10))
+    data = bytearray(code(0x180, 0x20))
+    targets = {0x200 + 0x10: 0x800 + 0x10, 0x200 + 0x1F0: 0x800 + 0x1F0, 0x400 + 0x08: 0x400 + 0x08, 0x400 + 0x101: 0x400 + 0x101}
+    for rva, offset in targets.items():
+        section = text if rva < 0x400 else data
+        struct.pack_into(fmt, section, rva - (0x200 if rva < 0x400 else 0x400), base + rva)
+
+    image = build_pe([(b'.text', 0x200, 0x800, bytes(text)), (b'.data', 0x400, 0x400, bytes(data))],
+                     {0: [(kind, rva) for rva in targets]}, image_base=base, plus=plus)
+    pe = pycoff.parser(write(tmp_path, 'r.exe', image))
+    assert sorted(pe.base_relocations().RVAs) == sorted(targets)
+
+    rebased = pe.rebase(new_base)
+    for rva, offset in targets.items():
+        assert struct.unpack_from(fmt, rebased, offset)[0] == base + rva + new_base - base
+
+    # Only the targets and ImageBase change
+    base_offset = 0x58 + (24 if plus else 28)
+    changed = {i for i in range(len(image)) if image[i] != rebased[i]}
+    allowed = {o + k for o in list(targets.values()) + [base_offset] for k in range(width)}
+    assert changed <= allowed